@@ -0,0 +1,95 @@
+import argparse
+import random
+from pathlib import Path
+
+from config.config import Config
+
+# Sizes of the generated databases, as numbers of batting records; each database has a fifth as many players, about
+# as in the mlb database
+SCALES = {'10k': 10 ** 4, '1m': 10 ** 6, '10m': 10 ** 7}
+CHUNK_RECORDS = 10 ** 4
+
+PLAYERS_HEADER = ('ID', 'birthYear', 'birthMonth', 'birthDay', 'birthCountry', 'birthState', 'birthCity', 'deathYear',
+                  'deathMonth', 'deathDay', 'deathCountry', 'deathState', 'deathCity', 'nameFirst', 'nameLast',
+                  'nameGiven', 'weight', 'height', 'bats', 'throws', 'debut', 'finalGame')
+BATTING_HEADER = ('ID', 'playerID', 'yearID', 'stint', 'teamID', 'lgID', 'G', 'AB', 'R', 'H', '2B', '3B', 'HR', 'RBI',
+                  'SB', 'CS', 'BB', 'SO', 'IBB', 'HBP', 'SH')
+
+BIRTHPLACES = (('USA', 'CA', 'Los Angeles'), ('USA', 'NY', 'New York'), ('USA', 'TX', 'Houston'),
+               ('USA', 'IL', 'Chicago'), ('USA', 'PA', 'Philadelphia'), ('USA', 'OH', 'Cleveland'),
+               ('D.R.', 'Santo Domingo', 'Santo Domingo'), ('Venezuela', 'Zulia', 'Maracaibo'),
+               ('P.R.', 'San Juan', 'San Juan'), ('Cuba', 'La Habana', 'Havana'), ('Japan', 'Tokyo', 'Tokyo'))
+FIRST_NAMES = ('David', 'Al', 'Joe', 'Erv', 'Corey', 'Miguel', 'Roberto', 'Luis', 'John', 'Bill', 'Frank', 'Jim',
+               'George', 'Charlie', 'Mike', 'Tom', 'Ed', 'Jose', 'Carlos', 'Ichiro')
+LAST_NAMES = ('Aardsma', 'Aber', 'Lange', 'Lansford', 'Seager', 'Castro', 'Osuna', 'Gonzalez', 'Smith', 'Johnson',
+              'Williams', 'Brown', 'Jones', 'Miller', 'Davis', 'Garcia', 'Rodriguez', 'Wilson', 'Martinez', 'Suzuki')
+MIDDLE_NAMES = ('Allan', 'Julius', 'Henry', 'Dale', 'James', 'Lee', 'Antonio', 'Edward', 'Michael', 'Ray')
+TEAMS = (('BOS', 'AL'), ('NYA', 'AL'), ('CLE', 'AL'), ('DET', 'AL'), ('CHA', 'AL'), ('OAK', 'AL'), ('SEA', 'AL'),
+         ('NYN', 'NL'), ('LAN', 'NL'), ('SFN', 'NL'), ('CHN', 'NL'), ('SLN', 'NL'), ('PHI', 'NL'), ('ATL', 'NL'))
+
+
+def player(rng, id_):
+    birth_year = rng.randint(1850, 1995)
+    country, state, city = rng.choice(BIRTHPLACES)
+    dead = birth_year < 1960 and rng.random() < 0.7
+    death = ((str(rng.randint(birth_year + 40, min(birth_year + 100, 2016))), str(rng.randint(1, 12)),
+              str(rng.randint(1, 28)), country, state, city) if dead else ('',) * 6)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    debut = birth_year + rng.randint(19, 26)
+    return (str(id_), str(birth_year), str(rng.randint(1, 12)), str(rng.randint(1, 28)), country, state, city, *death,
+            first, last, f'{first} {rng.choice(MIDDLE_NAMES)}', str(rng.randint(150, 260)), str(rng.randint(66, 80)),
+            rng.choice('RRRLB'), rng.choice('RRRL'), f'{debut}-0{rng.randint(4, 9)}-{rng.randint(10, 28)}',
+            f'{debut + rng.randint(0, 15)}-0{rng.randint(4, 9)}-{rng.randint(10, 28)}')
+
+
+def batting(rng, id_, num_players):
+    # Most seasons are short; home runs are rare, with a long tail
+    year = rng.randint(1871, 2015)
+    team, league = rng.choice(TEAMS)
+    games = min(int(rng.expovariate(1 / 60)) + 1, 162)
+    at_bats = min(int(games * rng.uniform(0, 4.2)), 700)
+    hits = int(at_bats * rng.uniform(0.15, 0.35))
+    home_runs = min(int(rng.expovariate(1 / 5) * at_bats / 400), 73)
+    modern = year >= 1955
+    return (str(id_), str(rng.randrange(num_players)), str(year), str(rng.choice((1, 1, 1, 1, 2))), team, league,
+            str(games), str(at_bats), str(int(hits * rng.uniform(0.3, 0.7))), str(hits), str(hits // 5),
+            str(hits // 40), str(home_runs), str(int(hits * rng.uniform(0.2, 0.6))), str(rng.randint(0, 30)),
+            str(rng.randint(0, 15)) if modern else '', str(int(at_bats * rng.uniform(0.05, 0.12))),
+            str(int(at_bats * rng.uniform(0.1, 0.25))) if modern else '', str(rng.randint(0, 10)) if modern else '',
+            str(rng.randint(0, 8)), str(rng.randint(0, 10)))
+
+
+def write_table(path, header, records):
+    unit_sep, record_sep = Config.unit_separator, Config.record_separator
+    with open(path, 'w') as table_file:
+        table_file.write(f'{unit_sep.join(header)}{record_sep}')
+        chunk = []
+        for record in records:
+            chunk.append(f'{unit_sep.join(record)}{record_sep}')
+            if len(chunk) == CHUNK_RECORDS:
+                table_file.write(''.join(chunk))
+                chunk.clear()
+        table_file.write(''.join(chunk))
+
+
+def write_database(directory, num_batting, *, seed=0):
+    # The same seed always gives the same tables, written a chunk of records at a time
+    rng = random.Random(seed)
+    num_players = max(num_batting // 5, 1)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    extension = Config.table_filename_extension
+    write_table(directory / f'players{extension}', PLAYERS_HEADER, (player(rng, i) for i in range(num_players)))
+    write_table(directory / f'batting{extension}', BATTING_HEADER,
+                (batting(rng, i, num_players) for i in range(num_batting)))
+    return num_players
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='benchmark.generate')
+    parser.add_argument('directory', help='directory of the database, which is created if needed')
+    parser.add_argument('--rows', choices=SCALES, default='10k', help='number of batting records')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    num_players = write_database(arguments.directory, SCALES[arguments.rows], seed=arguments.seed)
+    print(f'Wrote {SCALES[arguments.rows]} batting records and {num_players} players to {arguments.directory}')
@@ -0,0 +1,68 @@
+import re
+import timeit
+
+from my_sqlite.error import QuerySyntaxError
+from my_sqlite.parser import parse
+from my_sqlite.query import Insert
+
+# The regular expressions of the former InsertQueryBuilder, which matched the whole statement, then matched the VALUES
+# clause again and found its sets and values, before building the query in the same way
+VALUE = r'(?:(?<=[^\\])"(?:\\"|[^"])*(?<=[^\\])"|\?)'
+CAPTURED_VALUE = r'(?:(?<=[^\\])"((?:\\"|[^"])*)(?<=[^\\])"|(\?))'
+INSERT = re.compile(r'(?i:INSERT\s+INTO)\s+(?P<into>.+?)'
+                    r'(\s+(\((?P<columns>.+)\)))?'
+                    r'(\s+(?i:VALUES)\s+(?P<values>[\s\S]+))')
+SINGLE_SET = re.compile(r'\s*\(\s*' + VALUE + r'\s*(?:,\s*' + VALUE + r'\s*)*\)\s*')
+FULL_SET = re.compile(SINGLE_SET.pattern + '(?:,' + SINGLE_SET.pattern + ')*')
+
+
+def insert_statement(num_rows, *, keyword='VALUES'):
+    rows = ', '.join(f'("{i}", "First \\"{i}\\"", "{"Last" * 10}")' for i in range(num_rows))
+    return f'INSERT INTO players (id, nameFirst, nameLast) {keyword} {rows}'
+
+
+def regex_cascade(statement):
+    parts = INSERT.fullmatch(statement)
+    if parts is None:
+        raise QuerySyntaxError('input matches no known query')
+    values = parts.group('values')
+    if not FULL_SET.fullmatch(values):
+        raise QuerySyntaxError('wrong syntax in VALUES clause')
+    query = Insert()
+    query.into(parts.group('into'), columns=tuple(re.split(r'\s*,\s*', parts.group('columns'))))
+    query.values([[quoted.replace(r'\"', '"') for quoted, _ in re.findall(CAPTURED_VALUE, row)]
+                  for row in SINGLE_SET.findall(values)])
+    return query._insertions
+
+
+def token_parser(statement):
+    return parse(statement)._insertions
+
+
+def time_parse(implementation, statement, repeat):
+    def parse_statement():
+        try:
+            implementation(statement)
+        except QuerySyntaxError:
+            pass
+
+    return min(timeit.repeat(parse_statement, number=1, repeat=repeat))
+
+
+def run_benchmark(*, repeat=3):
+    if regex_cascade(insert_statement(100)) != token_parser(insert_statement(100)):
+        raise AssertionError('both implementations should read the same values')
+    # A misspelled VALUES keyword makes the former pattern try every split of the statement
+    for keyword, sizes in (('VALUES', (10 ** 4, 10 ** 5)), ('VALUE', (10 ** 3, 2 * 10 ** 3, 4 * 10 ** 3))):
+        for num_rows in sizes:
+            statement = insert_statement(num_rows, keyword=keyword)
+            print(f"Parsing an INSERT of {num_rows} rows ({len(statement)} characters) with '{keyword}'")
+            timings = {}
+            for implementation in (regex_cascade, token_parser):
+                timings[implementation] = time_parse(implementation, statement, repeat)
+                print(f'{implementation.__name__}: {timings[implementation]:.4f}s')
+            print(f'Speedup: {timings[regex_cascade] / timings[token_parser]:.2f}x')
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,39 @@
+import timeit
+
+from my_sqlite.conversion import converted
+from my_sqlite.parser import parse
+
+QUERY = ('SELECT nameFirst, nameLast, yearID, HR FROM players JOIN batting ON players.id = batting.playerID '
+         'ORDER BY HR DESC, nameLast, nameFirst, yearID')
+
+
+# The implementation of Select._order that ran one full stable sort per ordering term
+def successive_sorts(query, rows):
+    for key, reverse in reversed(query._order_keys):
+        def sort_key(row):
+            value = converted(row[key.table][key.column])
+            return (value != '' if reverse else value == ''), value
+
+        rows = sorted(rows, key=sort_key, reverse=reverse)
+    return rows
+
+
+def composite_sort(query, rows):
+    return list(query._order(rows))
+
+
+def run_benchmark(*, repeat=5):
+    query = parse(QUERY)
+    rows = list(filter(query._where_filter, query._get_rows()))
+    if successive_sorts(query, rows) != composite_sort(query, rows):
+        raise AssertionError('both implementations should produce the same ordering')
+    print(f"Ordering {len(rows)} rows on {len(query._order_keys)} terms")
+    timings = {}
+    for implementation in (successive_sorts, composite_sort):
+        timings[implementation] = min(timeit.repeat(lambda: implementation(query, rows), number=1, repeat=repeat))
+        print(f'{implementation.__name__}: {timings[implementation]:.4f}s')
+    print(f'Speedup: {timings[successive_sorts] / timings[composite_sort]:.2f}x')
+
+
+if __name__ == '__main__':
+    run_benchmark()
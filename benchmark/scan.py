@@ -0,0 +1,61 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from config.config import Config
+from my_sqlite import storage
+from my_sqlite.parser import parse
+from my_sqlite.query import AbstractQuery, FilteredQuery, TableCache
+
+QUERY = 'SELECT playerID, yearID, HR FROM batting WHERE HR > "30"'
+
+
+# A copy of the batting table where every record is repeated, with a new id, the given number of times
+def write_scaled_table(directory, *, scale):
+    source_path = Path(Config.database_path) / f'batting{Config.table_filename_extension}'
+    with open(source_path) as source:
+        header, *records = [record.split(Config.unit_separator) for record in storage.split_records(source)]
+    with open(Path(directory) / source_path.name, 'w') as destination:
+        destination.write(f'{Config.unit_separator.join(header)}{Config.record_separator}')
+        for copy in range(scale):
+            destination.write(''.join(
+                f'{Config.unit_separator.join([str(copy * len(records) + i), *record[1:]])}{Config.record_separator}'
+                for i, record in enumerate(records)))
+    return len(records) * scale
+
+
+def run_query(workers):
+    FilteredQuery._scan_workers = workers
+    query = parse(QUERY)
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        query.run()
+    return output.getvalue()
+
+
+def run_benchmark(*, scale=200, repeat=3):
+    workers = Config.scan_workers if Config.scan_workers > 1 else os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        num_records = write_scaled_table(directory, scale=scale)
+        AbstractQuery._database_path = directory
+        TableCache._budget = 0
+        FilteredQuery._parallel_min_size = 0
+        if run_query(1) != run_query(workers):
+            raise AssertionError('serial and parallel scans should produce the same rows')
+        print(f"Scanning {num_records} records with '{QUERY}'")
+        timings = {}
+        for num_workers in sorted({1, workers}):
+            timings[num_workers] = min(timeit.repeat(lambda: run_query(num_workers), number=1, repeat=repeat))
+            print(f'{num_workers} worker(s): {timings[num_workers]:.4f}s')
+    if workers > 1:
+        print(f'Speedup: {timings[1] / timings[workers]:.2f}x')
+    else:
+        print('Only one CPU is available; set scan_workers in config/config.py to compare with more workers',
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,202 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmark.generate import SCALES, write_database
+from config.config import Config
+from my_sqlite.connection import connect
+from my_sqlite.output import Output
+from my_sqlite.runner import QueryRunner
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BASELINES = Path(__file__).parent / 'baselines'
+# Number of runs of a statement that only reads after the first one, which reads the tables from disk
+WARM_RUNS = 3
+
+# A step of the workload. Its rows are those of its result, as given by a statement that counts them, or those it
+# writes. Each step runs in a new process in each of repeat rounds, since a process can be faster or slower than the
+# next one by more than the tolerance, depending on where its memory lies; each round of the write steps undoes what
+# the previous one did.
+Step = collections.namedtuple('Step', ['name', 'statement', 'rows', 'writes'])
+
+
+def workload(num_batting, num_players):
+    # The rows inserted by the first write step are the ones the following ones update and delete, so that the tables
+    # are the same after the workload as before it
+    num_inserted = max(num_batting // 1000, 100)
+    values = ', '.join(f'("bench-{i}", "{i % num_players}", "2016", "1", "BEN", "AL", "1", "4", "0", "1", "0", "0", '
+                       f'"0", "0", "0", "0", "0", "1", "0", "0", "0")' for i in range(num_inserted))
+    lookup = f'id = "{num_players // 2}"'
+    join = 'FROM batting JOIN players ON batting.playerID = players.id WHERE HR > "20"'
+    return [Step('point_lookup', f'SELECT nameFirst, nameLast, birthYear FROM players WHERE {lookup}',
+                 f'SELECT COUNT(*) FROM players WHERE {lookup}', False),
+            Step('range_filter', 'SELECT playerID, yearID, HR FROM batting WHERE HR > "30"',
+                 'SELECT COUNT(*) FROM batting WHERE HR > "30"', False),
+            Step('join', f'SELECT nameFirst, nameLast, yearID, HR {join}', f'SELECT COUNT(*) {join}', False),
+            Step('order_by', 'SELECT playerID, yearID, teamID, HR FROM batting ORDER BY yearID DESC, teamID, HR DESC',
+                 'SELECT COUNT(*) FROM batting', False),
+            Step('limit', 'SELECT playerID, yearID, HR FROM batting ORDER BY HR DESC, yearID LIMIT 10',
+                 min(num_batting, 10), False),
+            Step('bulk_insert', f'INSERT INTO batting VALUES {values}', num_inserted, True),
+            Step('update', 'UPDATE batting SET G = "0" WHERE teamID = "BEN"', num_inserted, True),
+            Step('delete', 'DELETE FROM batting WHERE teamID = "BEN"', num_inserted, True)]
+
+
+def run_step(directory, step):
+    # Run in a process of its own, so that its peak memory is its own and its tables are not cached yet
+    timings = []
+    Output.set_file(os.devnull)
+    try:
+        for _ in range(1 if step.writes else 1 + WARM_RUNS):
+            start = time.perf_counter()
+            QueryRunner.run(step.statement, database_path=directory)
+            timings.append(time.perf_counter() - start)
+    finally:
+        Output.set_file()
+    rows = step.rows if isinstance(step.rows, int) else connect(directory).execute(step.rows).fetchall()[0][0]
+    return int(rows), timings, peak_rss_mb()
+
+
+def summary(runs):
+    # The medians of the runs, which unlike their minimum are not set by a single lucky one, and the slowest run, up
+    # to which later runs are not reported as regressions; the time of a run of a statement that only reads is the
+    # median of its warm runs
+    rows = runs[0][0]
+    cold = [timings[0] for _, timings, _ in runs]
+    warm = [statistics.median(timings[1:] or timings) for _, timings, _ in runs]
+    peaks = [peak for _, _, peak in runs if peak is not None]
+    seconds = statistics.median(warm)
+    return {'rows': rows, 'cold_seconds': round(statistics.median(cold), 6), 'seconds': round(seconds, 6),
+            'slowest_seconds': round(max(warm), 6),
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+            'peak_rss_mb': round(max(peaks), 1) if peaks else None}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def run_workload(directory, num_batting, num_players, *, repeat):
+    results = {'rows': num_batting, 'players': num_players, 'repeat': repeat, 'host': host(),
+               'python': platform.python_version(), 'platform': platform.platform(), 'steps': {}}
+    steps = workload(num_batting, num_players)
+    runs = {step.name: [] for step in steps}
+    # Each run of a step is in a new process, which only imports the modules of the engine
+    with multiprocessing.get_context('spawn').Pool(processes=1, maxtasksperchild=1) as pool:
+        for _ in range(repeat):
+            for step in steps:
+                runs[step.name].append(pool.apply(run_step, (directory, step)))
+    for step in steps:
+        result = results['steps'][step.name] = summary(runs[step.name])
+        print(f"{step.name:<14}{result['seconds']:>10.4f}s (first run {result['cold_seconds']:.4f}s)"
+              f"{result['rows']:>10} rows{format_rate(result['rows_per_second']):>16}"
+              f"{format_memory(result['peak_rss_mb']):>14}")
+    return results
+
+
+def host():
+    # Timings are only compared with those of a baseline recorded on the same host
+    return f'{platform.node()} ({platform.machine()}, {os.cpu_count()} CPU)'
+
+
+def compare(results, baseline, *, tolerance):
+    # The steps whose peak memory exceeds that of the baseline by more than the tolerance, or whose time exceeds that
+    # of the slowest run of the baseline by more than the tolerance, since runs vary from process to process
+    if baseline['rows'] != results['rows']:
+        raise ValueError(f"the baseline is of {baseline['rows']} rows, not {results['rows']}")
+    same_host = baseline.get('host') == results['host']
+    if not same_host:
+        print(f"\nThe baseline was recorded on {baseline.get('host', 'another host')}, not on {results['host']}: the "
+              f"changes are shown, but not reported as regressions")
+    regressions = []
+    print(f"\n{'':<14}{'time':>10}{'baseline':>10}{'change':>9}{'peak RSS':>12}{'baseline':>10}{'change':>9}")
+    for name, result in results['steps'].items():
+        base = baseline['steps'].get(name)
+        if base is None:
+            print(f'{name:<14}not in the baseline')
+            continue
+        time_change = change(result['seconds'], base['seconds'])
+        memory_change = change(result['peak_rss_mb'], base['peak_rss_mb'])
+        slowest = change(result['seconds'], base.get('slowest_seconds', base['seconds']))
+        slower = same_host and slowest is not None and slowest > tolerance
+        larger = same_host and memory_change is not None and memory_change > tolerance
+        if slower or larger:
+            regressions.append(name)
+        print(f"{name:<14}{result['seconds']:>9.4f}s{base['seconds']:>9.4f}s{format_change(time_change):>9}"
+              f"{format_memory(result['peak_rss_mb']):>12}{format_memory(base['peak_rss_mb']):>10}"
+              f"{format_change(memory_change):>9}{'  REGRESSION' if slower or larger else ''}")
+    return regressions
+
+
+def change(value, base):
+    return None if value is None or not base else value / base - 1
+
+
+def format_change(change_):
+    return '-' if change_ is None else f'{change_:+.0%}'
+
+
+def format_rate(rows_per_second):
+    return '-' if rows_per_second is None else f'{rows_per_second:,.0f} rows/s'
+
+
+def format_memory(megabytes):
+    return '-' if megabytes is None else f'{megabytes:.1f} MB'
+
+
+def database(directory, num_batting):
+    # A directory that already holds a batting table is used as it is, so that large tables are only generated once
+    batting_path = Path(directory) / f'batting{Config.table_filename_extension}'
+    if not batting_path.is_file():
+        print(f'Generating {num_batting} batting records in {directory}')
+        write_database(directory, num_batting)
+    return int(connect(directory).execute('SELECT COUNT(*) FROM players').fetchall()[0][0])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='benchmark.workload')
+    parser.add_argument('--rows', choices=SCALES, default='10k', help='number of batting records')
+    parser.add_argument('--directory', help='database to generate, or to reuse if it was generated already; a '
+                                            'temporary directory by default')
+    parser.add_argument('--repeat', type=int, default=5, help='number of processes each step runs in')
+    parser.add_argument('--output', help='JSON file of the results; benchmark-<rows>.json by default')
+    parser.add_argument('--baseline', help='JSON file of the results to compare with; '
+                                           'benchmark/baselines/<rows>.json by default')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline instead')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='fraction by which a step may be slower or larger than in the baseline')
+    arguments = parser.parse_args()
+
+    num_rows = SCALES[arguments.rows]
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = arguments.directory or temporary_directory
+        results = run_workload(directory, num_rows, database(directory, num_rows), repeat=arguments.repeat)
+    baseline_path = Path(arguments.baseline or BASELINES / f'{arguments.rows}.json')
+    output_path = (baseline_path if arguments.save_baseline
+                   else Path(arguments.output or f'benchmark-{arguments.rows}.json'))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2) + '\n')
+    print(f'\nResults written to {output_path}')
+    if not arguments.save_baseline:
+        if not baseline_path.is_file():
+            print(f'No baseline at {baseline_path}; run with --save-baseline to make one')
+            sys.exit()
+        found = compare(results, json.loads(baseline_path.read_text()), tolerance=arguments.tolerance)
+        print(f"\n{len(found)} regression(s){f': {found}' if found else ''} against {baseline_path}")
+        sys.exit(1 if found else 0)
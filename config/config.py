@@ -2,12 +2,18 @@ import sys
 
 
 class Config:
-    try:
-        database_path = sys.argv[1]
-    except IndexError:
-        sys.exit('my_sqlite: Missing argument: path to the database')
+    # The default database, which is the argument of the scripts run from the command line. A Connection is given its
+    # own database instead.
+    database_path = sys.argv[1] if len(sys.argv) > 1 else None
     table_filename_extension = '.csv'
 
+    # Extension of the file that, next to each table, maps the ids of the table's records to their byte offsets.
+    primary_index_filename_extension = '.pk'
+
+    # Extension of the files created by CREATE INDEX, which hold the values of a column sorted along with the byte
+    # offsets of their records. For instance, an index on the column at index 2 of a table 'batting' is 'batting.2.idx'.
+    index_filename_extension = '.idx'
+
     # ASCII 31 (0x1F) Unit Separator - Used to indicate separation between units within a record.
     # See https://en.wikipedia.org/wiki/C0_and_C1_control_codes#Basic_ASCII_control_codes.
     unit_separator = chr(31)
@@ -15,3 +21,64 @@ class Config:
     # ASCII 30 (0x1E) Record Separator - Used to indicate separation between records within a table (within a group).
     # See https://en.wikipedia.org/wiki/C0_and_C1_control_codes#Basic_ASCII_control_codes.
     record_separator = chr(30)
+
+    # Number of characters read at once when scanning a table file.
+    scan_buffer_size = 2 ** 16
+
+    # Whether DELETE and UPDATE append their changes to a log next to the table, which is merged with the table file
+    # whenever the table is read, instead of rewriting the whole table file.
+    delta_log = False
+    delta_log_filename_extension = '.log'
+
+    # Extension of the file that, next to each table, is locked by the processes that read and write the table.
+    lock_filename_extension = '.lock'
+
+    # The log of a table is compacted back into the table file, as with VACUUM, once its size exceeds this fraction of
+    # the size of the table file. A ratio of None disables automatic compaction.
+    delta_log_compaction_ratio = 0.5
+
+    # Memory budget, in bytes, of the process-wide cache of parsed tables. Least recently used tables are evicted
+    # first when the budget is exceeded. Tables whose file is larger than the budget are always streamed from disk.
+    # A budget of 0 disables the cache.
+    table_cache_size = 256 * 2 ** 20
+
+    # Whether cached tables are stored column by column, numeric columns being held in typed arrays. Units are then
+    # converted once, when the table is loaded, instead of every time a query compares or sorts them.
+    columnar_tables = False
+
+    # A join without ON clause reads its first table in blocks of this many records, and matches each block against
+    # every record of its second table. The records of the second table are held in memory after the first block if
+    # there are at most join_buffer_records of them, once filtered; otherwise, the table is read again for each block.
+    join_block_size = 2 ** 12
+    join_buffer_records = 2 ** 20
+
+    # Number of worker processes that evaluate the WHERE clause of a SELECT or DELETE statement over a table file in
+    # parallel, each of them being given parallel_scan_chunk_size bytes of the file at a time. Only tables that are not
+    # cached and whose file is at least parallel_scan_min_size bytes are scanned in parallel. 1 disables parallel scans.
+    scan_workers = 1
+    parallel_scan_chunk_size = 2 ** 22
+    parallel_scan_min_size = 2 ** 24
+
+    # Number of records that COPY reads from its file, checks and appends to the table file at once.
+    copy_chunk_records = 2 ** 16
+
+    # Number of hashes kept per column by the catalog of tables, which estimates the number of distinct units of a column
+    # from the smallest hashes of its units. Estimates are within about 2 / sqrt(catalog_sketch_size) of the actual
+    # number, which they give exactly for columns with fewer distinct units.
+    catalog_sketch_size = 2 ** 10
+
+    # Number of rows of the result of a SELECT statement that are written at once, after the first one, which is written
+    # as soon as it is found.
+    output_chunk_rows = 2 ** 12
+
+    # Number of queries whose plan, i.e. the query object built from their text, is kept for when the same text is
+    # run again. A plan is dropped when the header of one of its tables changes. A size of 0 disables the cache.
+    plan_cache_size = 256
+
+    # Largest line, in bytes, that the server of my_sqlite.py --serve accepts from a client; a statement is sent as one
+    # line, so this bounds the size of the statements, e.g. of an INSERT of many rows.
+    server_line_limit = 2 ** 26
+
+    # Number of seconds the server waits for a client to read the result it is sent, chunk after chunk, before it ends
+    # the session. Statements run one at a time, so a client that stops reading holds every other session up to then.
+    server_send_timeout = 10
@@ -1,11 +1,78 @@
+import argparse
 import sys
 
 from config.config import Config
 from my_sqlite.conversion import decoded, queries_from_input_lines
-from my_sqlite.runner import QueryRunner
+from my_sqlite.output import Output
+from my_sqlite.query import Batch
+from my_sqlite.runner import QueryRunner, QUERY_ERRORS
+from my_sqlite.server import Server
+
+
+def run_command(line):
+    # Dot-commands set the format and the destination of the results of the SELECT statements that follow them
+    command, *arguments = line.split()
+    try:
+        if command == '.mode' and len(arguments) == 1:
+            Output.set_mode(arguments[0])
+        elif command == '.output' and len(arguments) <= 1:
+            Output.set_file(None if arguments in ([], ['stdout']) else arguments[0])
+        else:
+            print(f'Error: unknown command or wrong arguments: {line}\n'
+                  f"       use .mode {'|'.join(Output.modes)} or .output [<file>|stdout]")
+    except (ValueError, OSError) as e:
+        print(f'Error: {e}')
+
+
+def run_script(path):
+    # The statements of a script are run as one batch, so every table it writes to is rewritten once, at the end.
+    # Dot-commands are lines of their own, between statements. The first statement that fails rolls the whole batch
+    # back, and no other statement is run; returns whether the batch was committed.
+    try:
+        script_file = open(path)
+    except OSError as e:
+        print(f'Error: {e}')
+        return False
+    with script_file:
+        QueryRunner.run('BEGIN')
+        try:
+            lines = []
+            for line in map(str.strip, script_file):
+                if line.startswith('.') and not lines:
+                    run_command(line)
+                    continue
+                lines.append(line)
+                if line.endswith(';'):
+                    for query in queries_from_input_lines(lines):
+                        QueryRunner.run(decoded(query))
+                    lines = []
+            for query in queries_from_input_lines(lines):
+                QueryRunner.run(decoded(query))
+            if Batch.active():
+                QueryRunner.run('COMMIT')
+        except QUERY_ERRORS as e:
+            print(e)
+            if Batch.active():
+                QueryRunner.run('ROLLBACK')
+            print('Error: the script was rolled back')
+            return False
+    return True
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='my_sqlite')
+    parser.add_argument('database', help='path to the database directory')
+    parser.add_argument('-f', '--file', help='run the statements of a script file as one batch, then exit')
+    parser.add_argument('--serve', metavar='HOST:PORT', help='serve the statements of clients of my_sqlite.client')
+    arguments = parser.parse_args()
+    if arguments.file:
+        sys.exit(0 if run_script(arguments.file) else 1)
+    if arguments.serve:
+        host, _, port = arguments.serve.rpartition(':')
+        Server(arguments.database).serve(host or None, int(port))
+        sys.exit()
     print('\nmy_sqlite: DESCRIBE | SELECT | INSERT | UPDATE | DELETE')
+    print(f"Results are written with .mode {'|'.join(Output.modes)} to .output [<file>|stdout].")
     print('To exit the application, use CTRL + D.\n')
     try:
         while True:
@@ -14,6 +81,9 @@ if __name__ == '__main__':
             while not line or set(line) == {';'}:
                 print('my_sqlite>', end=' ')
                 line = input().strip()
+            if line.startswith('.'):
+                run_command(line)
+                continue
             lines.append(line)
             while not line or line[-1] != ';':
                 print('      ...>', end=' ')
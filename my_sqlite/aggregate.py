@@ -0,0 +1,86 @@
+from abc import ABC, abstractmethod
+
+from my_sqlite.columnar import converted_unit
+
+
+class Accumulator(ABC):
+    @staticmethod
+    def from_function(function):
+        return {'COUNT': Count, 'SUM': Sum, 'AVG': Average, 'MIN': Minimum, 'MAX': Maximum}[function]()
+
+    # column is None for COUNT(*), which counts every record
+    @abstractmethod
+    def add(self, record, column):
+        pass
+
+    @abstractmethod
+    def result(self):
+        pass
+
+
+class Count(Accumulator):
+    def __init__(self):
+        self.count = 0
+
+    def add(self, record, column):
+        if column is None or record[column] != '':
+            self.count += 1
+
+    def result(self):
+        return str(self.count)
+
+
+class Sum(Accumulator):
+    # Units that are not numbers are left out, and the sum of no numbers is empty
+    def __init__(self):
+        self.total = None
+        self.count = 0
+
+    def add(self, record, column):
+        value = converted_unit(record, column)
+        if type(value) is not str:
+            self.total = value if self.total is None else self.total + value
+            self.count += 1
+
+    def result(self):
+        return '' if self.total is None else str(self.total)
+
+
+class Average(Sum):
+    def result(self):
+        return '' if self.total is None else str(self.total / self.count)
+
+
+class Extremum(Accumulator):
+    # Numbers come before strings, as in ORDER BY; empty units and NaN are left out
+    def __init__(self):
+        self.key = None
+        self.unit = ''
+
+    def add(self, record, column):
+        value = converted_unit(record, column)
+        if value == '' or value != value:
+            return
+        key = type(value) is str, value
+        if self.key is None or self._precedes(key, self.key):
+            self.key, self.unit = key, record[column]
+
+    def result(self):
+        return self.unit
+
+    @staticmethod
+    @abstractmethod
+    def _precedes(key, other):
+        pass
+
+
+class Minimum(Extremum):
+    @staticmethod
+    def _precedes(key, other):
+        return key < other
+
+
+class Maximum(Extremum):
+    @staticmethod
+    def _precedes(key, other):
+        return key > other
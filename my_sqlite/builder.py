@@ -4,8 +4,10 @@ from abc import ABC, abstractmethod
 
 from my_sqlite.conversion import converted
 from my_sqlite.error import QuerySyntaxError, InsertError
-from my_sqlite.operator import Operator
-from my_sqlite.query import Select, Update, Delete, Insert, Describe
+from my_sqlite.lexer import OPERATORS, is_symbol, split, text_of, unquoted
+from my_sqlite.operator import Condition
+from my_sqlite.query import Select, Update, Delete, Insert, Copy, Describe, CreateIndex, Vacuum, Transaction, \
+    Explain, Aggregate, Parameter
 
 
 def return_self(method):
@@ -17,6 +19,11 @@ def return_self(method):
     return wrapper
 
 
+def value_of(token):
+    # The value of a quoted value token, or a placeholder for a parameter of the query
+    return Parameter() if token.kind == 'parameter' else unquoted(token)
+
+
 def non_null_argument(method):
     @functools.wraps(method)
     def wrapper(self, arg, *args, **kwargs):
@@ -28,215 +35,226 @@ def non_null_argument(method):
 
 
 class AbstractQueryBuilder(ABC):
+    # Builders are given the parts of a statement as lists of tokens, or None for the clauses it does not have
     def __init__(self, *, query=None):
         self.query = query
 
-    @staticmethod
-    @property
-    @abstractmethod
-    def pattern():
-        pass
-
     @classmethod
     @abstractmethod
     def from_parts(cls, parts):
         pass
 
     @return_self
-    def from_(self, raw_value):
-        try:
-            table = re.fullmatch(r'[\w.]+', raw_value).group()
-        except AttributeError:
-            raise QuerySyntaxError('FROM clause expects exactly one table name')
-        self.query.from_(table)
+    def from_(self, tokens):
+        self.query.from_(self._name(tokens, 'FROM clause expects exactly one table name'))
 
     @return_self
     @non_null_argument
-    def where(self, raw_value):
-        pattern = re.compile(r'([\w.]+)\s*(<=|<|=|!=|>=|>)\s*(?<=[^\\])"((?:\\"|[^"])*)(?<=[^\\])"\s*')
-        try:
-            column, operator, input_value = pattern.fullmatch(raw_value).groups()
-        except AttributeError:
+    def where(self, tokens):
+        if (len(tokens) != 3 or tokens[0].kind != 'name' or tokens[1].kind != 'symbol'
+                or tokens[1].text not in OPERATORS or tokens[2].kind not in ('value', 'parameter')):
             raise QuerySyntaxError('WHERE clause syntax expected to be <column> <operator> "<value>",\n'
                                    '       where <operator> is one of <, <=, =, !=, >=, >')
-        operator, input_value = Operator.from_symbol(operator), converted(input_value.replace(r'\"', '"'))
-        self.query.where(column, condition=lambda value: operator(value, input_value))
+        column, operator, value = tokens
+        condition_value = value_of(value) if value.kind == 'parameter' else converted(value_of(value))
+        self.query.where(column.text, condition=Condition(operator.text, condition_value))
 
+    @staticmethod
+    def _name(tokens, message):
+        if len(tokens) != 1 or tokens[0].kind != 'name':
+            raise QuerySyntaxError(message)
+        return tokens[0].text
 
-class DescribeQueryBuilder(AbstractQueryBuilder):
-    pattern = re.compile(r'(?i:DESCRIBE)\s+(?P<table>.+)')
 
+class DescribeQueryBuilder(AbstractQueryBuilder):
     def __init__(self):
         super().__init__()
 
     @classmethod
     def from_parts(cls, parts):
-        [table] = parts.groupdict().values()
-        return cls().describe(table).query
+        return cls().describe(parts['table']).query
 
     @return_self
-    def describe(self, table):
-        self.query = Describe(table)
+    def describe(self, tokens):
+        self.query = Describe(text_of(tokens))
 
 
 class SelectQueryBuilder(AbstractQueryBuilder):
-    pattern = re.compile(r'(?i:SELECT)\s+(?P<select>.+)'
-                         r'\s+(?i:FROM)\s+(?P<from_>.+?)'
-                         r'(\s+(?i:JOIN)\s+(?P<join>.+?)(\s+(?i:ON)\s+(?P<on>.+?))?)?'
-                         r'(\s+(?i:WHERE)\s+(?P<where>[\s\S]+?))?'
-                         r'(\s+(?i:ORDER\s+BY)\s+(?P<order_by>.+?))?'
-                         r'(\s+(?i:LIMIT)\s+(?P<limit>.+?))?')
-
     def __init__(self):
         super().__init__(query=Select())
 
     @classmethod
     def from_parts(cls, parts):
-        select, from_, join, on, where, order_by, limit = parts.groupdict().values()
         return (cls()
-                .from_(from_)
-                .join(join, on)
-                .where(where)
-                .select(select)
-                .order_by(order_by)
-                .limit(limit)
+                .from_(parts['from_'])
+                .join(parts['join'], parts['on'])
+                .where(parts['where'])
+                .group_by(parts['group_by'])
+                .select(parts['select'])
+                .order_by(parts['order_by'])
+                .limit(parts['limit'])
                 .query)
 
     @return_self
     @non_null_argument
-    def join(self, raw_join, raw_on):
-        try:
-            table = re.fullmatch(r'[\w.]+', raw_join).group()
-        except AttributeError:
-            raise QuerySyntaxError('JOIN clause expects exactly one table name')
-        self.query.join(table, on=self._get_on_keys(raw_on))
+    def where(self, tokens):
+        if (len(tokens) == 3 and is_symbol(tokens[1], '=')
+                and all(token.kind == 'name' and re.match(r'[A-Za-z_]', token.text) for token in tokens[::2])):
+            self.query.where_equal(tokens[0].text, tokens[2].text)
+        else:
+            super().where(tokens)
+
+    @return_self
+    @non_null_argument
+    def join(self, join_tokens, on_tokens):
+        table = self._name(join_tokens, 'JOIN clause expects exactly one table name')
+        self.query.join(table, on=self._get_on_keys(on_tokens))
 
     @return_self
-    def select(self, raw_value):
-        self.query.select(filter(None, re.split(r'\s*,\s*', raw_value)))
+    @non_null_argument
+    def group_by(self, tokens):
+        columns = split(tokens)
+        if not all(len(column) == 1 and column[0].kind == 'name' for column in columns):
+            raise QuerySyntaxError('GROUP BY clause expects one or more column names')
+        self.query.group_by([column.text for [column] in columns])
+
+    @return_self
+    def select(self, tokens):
+        self.query.select(map(self._aggregate, filter(None, split(tokens))))
 
     @return_self
     @non_null_argument
-    def order_by(self, raw_value):
-        raw_ordering_terms = re.split(r'\s*,\s*', raw_value)
+    def order_by(self, tokens):
         ordering_terms = []
-        for raw_term in raw_ordering_terms:
-            try:
-                column, ascending = re.fullmatch(r"(?P<column>[\w.]+)(\s+(?P<ascending>(?i:asc|desc)))?",
-                                                 raw_term).groupdict().values()
-            except AttributeError:
+        for term in split(tokens):
+            ascending = True
+            if len(term) > 1 and term[-1].kind == 'name' and term[-1].text.upper() in ('ASC', 'DESC'):
+                ascending = term.pop().text.upper() == 'ASC'
+            if not (len(term) == 1 and term[0].kind == 'name' or self._is_call(term)):
                 raise QuerySyntaxError('wrong syntax in ORDER BY clause')
-            ordering_terms.append((column, ascending is None or ascending.lower() == 'asc'))
+            ordering_terms.append((self._aggregate(term), ascending))
         self.query.order_by(ordering_terms)
 
+    @staticmethod
+    def _is_call(tokens):
+        return (len(tokens) >= 3 and tokens[0].kind == 'name' and is_symbol(tokens[1], '(')
+                and is_symbol(tokens[-1], ')'))
+
+    @classmethod
+    def _aggregate(cls, tokens):
+        # Turns an aggregate function call into an Aggregate; other terms are column names, which are left as they are
+        if not cls._is_call(tokens):
+            return text_of(tokens)
+        function, arguments = tokens[0].text.upper(), tokens[2:-1]
+        if (function not in ('COUNT', 'SUM', 'AVG', 'MIN', 'MAX') or len(arguments) != 1
+                or not (arguments[0].kind == 'name' or function == 'COUNT' and is_symbol(arguments[0], '*'))):
+            raise QuerySyntaxError('aggregate functions are COUNT, SUM, AVG, MIN and MAX, of one column name;\n'
+                                   '       only COUNT also takes *')
+        [column] = arguments
+        return Aggregate(function, None if column.kind == 'symbol' else column.text)
+
     @return_self
     @non_null_argument
-    def limit(self, raw_value):
+    def limit(self, tokens):
         try:
-            self.query.limit(int(raw_value))
+            self.query.limit(int(text_of(tokens)))
         except ValueError:
             raise QuerySyntaxError('LIMIT clause takes exactly one integer')
 
     @non_null_argument
-    def _get_on_keys(self, raw_value):
-        try:
-            on_left, on_right = re.fullmatch(r'([\w.]+)\s*=\s*([\w.]+)\s*', raw_value).groups()
-        except AttributeError:
+    def _get_on_keys(self, tokens):
+        if len(tokens) != 3 or tokens[0].kind != 'name' or not is_symbol(tokens[1], '=') or tokens[2].kind != 'name':
             raise QuerySyntaxError('ON clause syntax expected to be <column_1> = <column_2>')
-        return on_left, on_right
+        return tokens[0].text, tokens[2].text
 
 
 class UpdateQueryBuilder(AbstractQueryBuilder):
-    pattern = re.compile(
-        r'(?i:UPDATE)\s+(?P<update>.+)\s+(?i:SET)\s+(?P<set_>[\s\S]+?)(\s+(?i:WHERE)\s+(?P<where>[\s\S]+?))?')
-
     def __init__(self):
         super().__init__()
 
     @classmethod
     def from_parts(cls, parts):
-        update, set_, where = parts.groupdict().values()
         return (cls()
-                .update(update)
-                .set_(set_)
-                .where(where)
+                .update(parts['update'])
+                .set_(parts['set_'])
+                .where(parts['where'])
                 .query)
 
     @return_self
-    def update(self, raw_value):
-        try:
-            table = re.fullmatch(r'[\w.]+', raw_value).group()
-        except AttributeError:
-            raise QuerySyntaxError('UPDATE expects exactly one table name')
-        self.query = Update(table)
-
-    @return_self
-    def set_(self, raw_value):
-        # Matches one 'column = "value"' pair
-        single_pair = re.compile(r'\s*(\w+)\s*=\s*(?<=[^\\])"((?:\\"|[^"])*)(?<=[^\\])"\s*')
-        full_set = re.compile(single_pair.pattern + '(,' + single_pair.pattern + ')*')
-        if not full_set.fullmatch(raw_value):
-            raise QuerySyntaxError('wrong syntax in SET clause')
-        update_dict = {column: value.replace(r'\"', '"') for column, value in single_pair.findall(raw_value)}
+    def update(self, tokens):
+        self.query = Update(self._name(tokens, 'UPDATE expects exactly one table name'))
+
+    @return_self
+    def set_(self, tokens):
+        # One 'column = "value"' pair per item, where the column is a name without a table
+        update_dict = {}
+        for pair in split(tokens):
+            if (len(pair) != 3 or pair[0].kind != 'name' or '.' in pair[0].text or not is_symbol(pair[1], '=')
+                    or pair[2].kind not in ('value', 'parameter')):
+                raise QuerySyntaxError('wrong syntax in SET clause')
+            update_dict[pair[0].text] = value_of(pair[2])
         self.query.set(update_dict)
 
 
 class DeleteQueryBuilder(AbstractQueryBuilder):
-    pattern = re.compile(r'(?i:DELETE\s+FROM)\s+(?P<from_>.+?)(\s+(?i:WHERE)\s+(?P<where>[\s\S]+?))?')
-
     def __init__(self):
         super().__init__(query=Delete())
 
     @classmethod
     def from_parts(cls, parts):
-        from_, where = parts.groupdict().values()
         return (cls()
-                .from_(from_)
-                .where(where)
+                .from_(parts['from_'])
+                .where(parts['where'])
                 .query)
 
 
 class InsertQueryBuilder(AbstractQueryBuilder):
-    pattern = re.compile(r'(?i:INSERT\s+INTO)\s+(?P<into>.+?)'
-                         r'(\s+(\((?P<columns>.+)\)))?'
-                         r'(\s+(?i:VALUES)\s+(?P<values>[\s\S]+))')
-
     def __init__(self):
         super().__init__(query=Insert())
         self._columns = None
 
     @classmethod
     def from_parts(cls, parts):
-        into, columns, values = parts.groupdict().values()
         return (cls()
-                .columns(columns)
-                .into(into)
-                .values(values)
+                .columns(parts['columns'])
+                .into(parts['into'])
+                .values(parts['values'])
                 .query)
 
     @return_self
-    def into(self, raw_into):
-        try:
-            table = re.fullmatch(r'[\w.]+', raw_into).group()
-        except AttributeError:
-            raise QuerySyntaxError('INSERT expects exactly one table name')
-        self.query.into(table, columns=self._columns)
+    def into(self, tokens):
+        self.query.into(self._name(tokens, 'INSERT expects exactly one table name'), columns=self._columns)
 
     @return_self
     @non_null_argument
-    def columns(self, raw_columns):
-        self._columns = tuple(filter(None, re.split(r'\s*,\s*', raw_columns)))
+    def columns(self, tokens):
+        self._columns = tuple(map(text_of, filter(None, split(tokens))))
 
     @return_self
-    def values(self, raw_content):
-        # Matches one '("value1", "value2", ...)' set
-        single_set = re.compile(
-            r'\s*\(\s*(?<=[^\\])"(?:\\"|[^"])*(?<=[^\\])"\s*(?:,\s*(?<=[^\\])"(?:\\"|[^"])*(?<=[^\\])"\s*)*\)\s*')
-        full_set = re.compile(single_set.pattern + '(?:,' + single_set.pattern + ')*')
-        if not full_set.fullmatch(raw_content):
+    def values(self, tokens):
+        # '("value1", "value2", ...)' sets separated by commas, read in a single pass over the tokens; the expected
+        # token is tracked in a state rather than by recursion, since a statement may hold a great many sets
+        rows, row, expected = [], None, '('
+        for token in tokens:
+            kind, text = token.kind, token.text
+            if expected == 'value' and kind in ('value', 'parameter'):
+                row.append(Parameter() if kind == 'parameter' else text[1:-1].replace(r'\"', '"'))
+                expected = ')'
+            elif kind != 'symbol':
+                raise QuerySyntaxError('wrong syntax in VALUES clause')
+            elif expected == ')' and text == ',':
+                expected = 'value'
+            elif expected == ')' and text == ')':
+                rows.append(row)
+                expected = ','
+            elif expected == text == '(':
+                row, expected = [], 'value'
+            elif expected == text == ',':
+                expected = '('
+            else:
+                raise QuerySyntaxError('wrong syntax in VALUES clause')
+        if expected != ',':
             raise QuerySyntaxError('wrong syntax in VALUES clause')
-        rows = [[value.replace(r'\"', '"') for value in re.findall(r'(?<=[^\\])"((?:\\"|[^"])*)(?<=[^\\])"', row)]
-                for row in single_set.findall(raw_content)]
         if len(set(map(len, rows))) > 1:
             raise InsertError('all VALUES must have the same number of terms')
         if self._columns:
@@ -244,3 +262,96 @@ class InsertQueryBuilder(AbstractQueryBuilder):
             if length_discrepancy:
                 raise InsertError(f"{length_discrepancy} values for {len(self._columns)} columns")
         self.query.values(rows)
+
+
+class CopyQueryBuilder(AbstractQueryBuilder):
+    def __init__(self):
+        super().__init__(query=Copy())
+
+    @classmethod
+    def from_parts(cls, parts):
+        return (cls()
+                .copy(parts['copy'])
+                .from_(parts['from_'])
+                .delimiter(parts['delimiter'])
+                .query)
+
+    @return_self
+    def copy(self, tokens):
+        self.query.copy(self._name(tokens, 'COPY expects exactly one table name'))
+
+    @return_self
+    def from_(self, tokens):
+        if len(tokens) != 1 or tokens[0].kind != 'value':
+            raise QuerySyntaxError('FROM clause of COPY expects exactly one quoted file path')
+        self.query.from_(unquoted(tokens[0]))
+
+    @return_self
+    @non_null_argument
+    def delimiter(self, tokens):
+        # A tab may be written as \t
+        if len(tokens) != 1 or tokens[0].kind != 'value' or len(unquoted(tokens[0]).replace(r'\t', '\t')) != 1:
+            raise QuerySyntaxError('DELIMITER expects exactly one quoted character')
+        self.query.delimiter(unquoted(tokens[0]).replace(r'\t', '\t'))
+
+
+class CreateIndexQueryBuilder(AbstractQueryBuilder):
+    def __init__(self):
+        super().__init__(query=CreateIndex())
+
+    @classmethod
+    def from_parts(cls, parts):
+        return cls().on(parts['table'], parts['column']).query
+
+    @return_self
+    def on(self, table_tokens, column_tokens):
+        message = 'CREATE INDEX expects exactly one table name and one column name'
+        table, column = self._name(table_tokens, message), self._name(column_tokens, message)
+        if '.' in column:
+            raise QuerySyntaxError(message)
+        self.query.on(table, column)
+
+
+class VacuumQueryBuilder(AbstractQueryBuilder):
+    def __init__(self):
+        super().__init__(query=Vacuum())
+
+    @classmethod
+    def from_parts(cls, parts):
+        return cls().vacuum(parts['table']).query
+
+    @return_self
+    def vacuum(self, tokens):
+        if tokens is None:
+            self.query.vacuum()
+            return
+        self.query.vacuum(self._name(tokens, 'VACUUM expects at most one table name'))
+
+
+class TransactionQueryBuilder(AbstractQueryBuilder):
+    def __init__(self):
+        super().__init__(query=Transaction())
+
+    @classmethod
+    def from_parts(cls, parts):
+        return cls().statement(parts['statement']).query
+
+    @return_self
+    def statement(self, tokens):
+        self.query.statement(tokens[0].text.upper())
+
+
+class ExplainQueryBuilder(AbstractQueryBuilder):
+    # The statement to explain is given already built, since it is parsed on its own
+    def __init__(self):
+        super().__init__()
+
+    @classmethod
+    def from_parts(cls, parts):
+        return cls().explain(parts['explain'], parts['statement']).query
+
+    @return_self
+    def explain(self, tokens, statement):
+        if isinstance(statement, Explain):
+            raise QuerySyntaxError('EXPLAIN expects a statement other than EXPLAIN')
+        self.query = Explain(statement, analyze=len(tokens) == 2)
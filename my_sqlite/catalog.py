@@ -0,0 +1,175 @@
+import collections
+import heapq
+import os
+import zlib
+
+from config.config import Config
+from my_sqlite import storage
+from my_sqlite.conversion import converted
+from my_sqlite.delta import DeltaLog
+
+TableStatistics = collections.namedtuple('TableStatistics', ['rows', 'size', 'mtime'])
+ColumnStatistics = collections.namedtuple('ColumnStatistics', ['distinct', 'min', 'max'])
+FileState = collections.namedtuple('FileState', ['mtime', 'size', 'inode', 'log'])
+
+
+class Catalog:
+    # The headers and statistics of every table the process reads, along with the state of the files they were read
+    # from. Headers are read once per table file, and statistics when they are first asked for. When a table file grows
+    # in place, only the appended records are read; when it is replaced, or its log changes, what was read is dropped.
+    # Write queries of the process update the entries of their tables themselves, so that they do not read them again.
+    _entries = {}
+
+    @classmethod
+    def headers(cls, table_path):
+        return cls._entry(table_path).headers
+
+    @classmethod
+    def statistics(cls, table_path):
+        entry = cls._entry(table_path)
+        if entry.rows is None:
+            log = DeltaLog.load(table_path)
+            deletions = 0 if log is None else sum(record is None for record in log.changes.values())
+            entry.rows = storage.count_records(table_path) - 1 - deletions
+        return TableStatistics(rows=entry.rows, size=entry.state.size, mtime=entry.state.mtime)
+
+    @classmethod
+    def column_statistics(cls, table_path, column):
+        entry = cls._entry(table_path)
+        if column not in entry.sketches:
+            sketch = ColumnSketch()
+            sketch.add(cls._units(table_path, column))
+            entry.sketches[column] = sketch
+        return entry.sketches[column].statistics()
+
+    @classmethod
+    def appended(cls, table_path, records, *, start):
+        # Records were appended to the table file from the given byte offset
+        entry = cls._entries.get(table_path)
+        if entry is None or entry.state.size != start:
+            cls._entries.pop(table_path, None)
+            return
+        entry.state = cls._state(table_path)
+        if entry.rows is not None:
+            entry.rows += len(records)
+        for column, sketch in entry.sketches.items():
+            sketch.add(record[column] for record in records)
+
+    @classmethod
+    def changed(cls, table_path, changes, *, previous_log):
+        # (offset, record) pairs were appended to the log of the table, a record of None standing for a deletion; the
+        # sketches are given the new units but keep the former ones, since units cannot be removed from them
+        entry = cls._entries.get(table_path)
+        if entry is None or entry.state.log != previous_log:
+            cls._entries.pop(table_path, None)
+            return
+        entry.state = cls._state(table_path)
+        if entry.rows is not None:
+            entry.rows -= sum(record is None for _, record in changes)
+        for column, sketch in entry.sketches.items():
+            sketch.add(record[column] for _, record in changes if record is not None)
+
+    @classmethod
+    def rewritten(cls, table_path, rows=None):
+        # The table file was replaced, and its log removed; the sketches are only made again when asked for
+        entry = cls._entries.get(table_path)
+        if entry is not None:
+            entry.state, entry.rows, entry.sketches = cls._state(table_path), rows, {}
+
+    @classmethod
+    def _entry(cls, table_path):
+        state = cls._state(table_path)
+        entry = cls._entries.get(table_path)
+        if entry is not None and entry.state != state:
+            entry = cls._refreshed(table_path, entry, state)
+        if entry is None:
+            with open(table_path) as table_file:
+                header = next(storage.split_records(table_file), '')
+            headers = header.rstrip(Config.record_separator).split(Config.unit_separator)
+            entry = cls._entries[table_path] = CatalogEntry(state, headers)
+        return entry
+
+    @classmethod
+    def _refreshed(cls, table_path, entry, state):
+        # The entry of a table file that grew in place, with the same log, is given the records appended to it;
+        # otherwise it is dropped
+        if (state.inode != entry.state.inode or state.log != entry.state.log or state.size < entry.state.size
+                or entry.state.size == 0):
+            del cls._entries[table_path]
+            return None
+        start, entry.state = entry.state.size, state
+        if entry.rows is not None:
+            entry.rows += storage.count_records(table_path, start)
+        for column, sketch in entry.sketches.items():
+            sketch.add(unit for _, unit in storage.offset_units(table_path, column, start))
+        return entry
+
+    @staticmethod
+    def _state(table_path):
+        stat = os.stat(table_path)
+        return FileState(mtime=stat.st_mtime_ns, size=stat.st_size, inode=stat.st_ino,
+                         log=DeltaLog.stamp_of(table_path))
+
+    @staticmethod
+    def _units(table_path, column):
+        log = DeltaLog.load(table_path)
+        for offset, unit in storage.offset_units(table_path, column):
+            if log is not None and offset in log.changes:
+                record = log.changes[offset]
+                if record is None:
+                    continue
+                unit = record[column]
+            yield unit
+
+
+class CatalogEntry:
+    def __init__(self, state, headers):
+        self.state = state
+        self.headers = headers
+        # The number of records, and the sketches of the columns, which are None and missing until asked for
+        self.rows = None
+        self.sketches = {}
+
+
+class ColumnSketch:
+    # Estimates the number of distinct units of a column from the k smallest of their hashes, and keeps the least and
+    # greatest of their values, empty units aside. Units are only ever added, so that the estimates of a column whose
+    # units were replaced may be too high until the table is rewritten.
+    _size = Config.catalog_sketch_size
+    _hash_range = 2 ** 32
+
+    def __init__(self):
+        # The smallest hashes, negated so that the greatest of them is at the top of the heap
+        self._heap = []
+        self._hashes = set()
+        self._min = self._max = None
+
+    def add(self, units):
+        heap, hashes, size = self._heap, self._hashes, self._size
+        low, high = self._min, self._max
+        for unit in units:
+            hash_ = zlib.crc32(unit.encode())
+            if hash_ not in hashes:
+                if len(heap) < size:
+                    heapq.heappush(heap, -hash_)
+                    hashes.add(hash_)
+                elif hash_ < -heap[0]:
+                    hashes.discard(-heapq.heapreplace(heap, -hash_))
+                    hashes.add(hash_)
+            if unit:
+                value = converted(unit)
+                # Numbers come before strings, as in indexes; NaN is left out, since it compares with nothing
+                key = (1, value) if isinstance(value, str) else (0, value)
+                if value == value and (low is None or key < low):
+                    low = key
+                if value == value and (high is None or key > high):
+                    high = key
+        self._min, self._max = low, high
+
+    def statistics(self):
+        if len(self._heap) < self._size:
+            distinct = len(self._heap)
+        else:
+            distinct = round((self._size - 1) * self._hash_range / (-self._heap[0] + 1))
+        return ColumnStatistics(distinct=distinct, min=None if self._min is None else self._min[1],
+                                max=None if self._max is None else self._max[1])
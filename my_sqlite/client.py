@@ -0,0 +1,76 @@
+import argparse
+import socket
+import sys
+
+from my_sqlite.conversion import queries_from_input_lines
+from my_sqlite.error import RemoteError
+
+
+class Client:
+    # Runs statements on a server started with my_sqlite.py --serve, one at a time, following the protocol described
+    # in my_sqlite.server
+    def __init__(self, address):
+        host, _, port = address.rpartition(':')
+        self._socket = socket.create_connection((host or 'localhost', int(port)))
+        self._responses = self._socket.makefile('rb')
+
+    def execute(self, statement):
+        return ''.join(self.results(statement))
+
+    def results(self, statement):
+        # The result of a single statement, in the chunks the server sends it in, which must all be read before the
+        # next statement is sent; the statement is sent as one line
+        line = statement.replace('\n', ' ').strip().rstrip(';')
+        self._socket.sendall(f'{line};\n'.encode())
+        return self._response()
+
+    def command(self, line):
+        self._socket.sendall(f'{line.strip()}\n'.encode())
+        return ''.join(self._response())
+
+    def close(self):
+        self._responses.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _response(self):
+        while True:
+            status, _, length = self._responses.readline().decode().rstrip('\n').partition(' ')
+            if status == 'DATA':
+                yield self._responses.read(int(length)).decode()
+            elif status == 'OK':
+                return
+            elif status == 'ERROR':
+                raise RemoteError(self._responses.read(int(length)).decode())
+            else:
+                raise ConnectionError('the server closed the connection')
+
+
+if __name__ == '__main__':
+    # Reads statements and dot-commands from the standard input, as the prompt of my_sqlite.py does, and writes their
+    # results as the server sends them
+    parser = argparse.ArgumentParser(prog='my_sqlite.client')
+    parser.add_argument('address', help='host:port of a server started with my_sqlite.py --serve')
+    arguments = parser.parse_args()
+    with Client(arguments.address) as client:
+        lines = []
+        for line in map(str.strip, sys.stdin):
+            try:
+                if line.startswith('.') and not lines:
+                    client.command(line)
+                    continue
+                lines.append(line)
+                if line.endswith(';'):
+                    for query in queries_from_input_lines(lines):
+                        for chunk in client.results(query):
+                            sys.stdout.write(chunk)
+                        sys.stdout.flush()
+                    lines = []
+            except RemoteError as error:
+                print(error)
+                lines = []
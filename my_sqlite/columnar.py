@@ -0,0 +1,102 @@
+import sys
+from array import array
+
+from my_sqlite.conversion import converted
+
+
+def converted_unit(record, column):
+    if type(record) is ColumnarRecord:
+        return record.table.columns[column].value(record.position)
+    return converted(record[column])
+
+
+class ColumnarTable:
+    def __init__(self, columns, length):
+        self.columns = columns
+        self.length = length
+
+    @classmethod
+    def from_records(cls, records):
+        width = len(records[0]) if records else 0
+        return cls([Column.from_units([record[i] for record in records]) for i in range(width)], len(records))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return (ColumnarRecord(self, position) for position in range(self.length))
+
+    def footprint(self):
+        return sys.getsizeof(self.columns) + sum(column.footprint() for column in self.columns)
+
+
+class ColumnarRecord:
+    __slots__ = ('table', 'position')
+
+    def __init__(self, table, position):
+        self.table = table
+        self.position = position
+
+    def __getitem__(self, column):
+        return self.table.columns[column].text(self.position)
+
+    def __len__(self):
+        return len(self.table.columns)
+
+    def __iter__(self):
+        return (column.text(self.position) for column in self.table.columns)
+
+    def copy(self):
+        return list(self)
+
+
+class Column:
+    @staticmethod
+    def from_units(units):
+        values = list(map(converted, units))
+        types = {type(value) for value in values if value != ''}
+        if types == {int} and NumericColumn.stores(units, values, 'q'):
+            return NumericColumn(units, values, 'q')
+        if types == {float} and NumericColumn.stores(units, values, 'd'):
+            return NumericColumn(units, values, 'd')
+        return TextColumn(units, values)
+
+
+class NumericColumn(Column):
+    _bounds = {'q': (-2 ** 63, 2 ** 63)}
+
+    def __init__(self, units, values, typecode):
+        self.nulls = bytearray(unit == '' for unit in units)
+        self.values = array(typecode, (0 if value == '' else value for value in values))
+
+    @classmethod
+    def stores(cls, units, values, typecode):
+        # Typed storage is only used when every unit can be given back exactly as it was read
+        low, high = cls._bounds.get(typecode, (-float('inf'), float('inf')))
+        return all(unit == '' or (str(value) == unit and low <= value < high) for unit, value in zip(units, values))
+
+    def text(self, position):
+        return '' if self.nulls[position] else str(self.values[position])
+
+    def value(self, position):
+        return '' if self.nulls[position] else self.values[position]
+
+    def footprint(self):
+        return sys.getsizeof(self.values) + sys.getsizeof(self.nulls)
+
+
+class TextColumn(Column):
+    def __init__(self, units, values):
+        self.units = units
+        self.values = values
+
+    def text(self, position):
+        return self.units[position]
+
+    def value(self, position):
+        return self.values[position]
+
+    def footprint(self):
+        # Units that are not numbers are their own converted value, so they are only counted once
+        return (sys.getsizeof(self.units) + sys.getsizeof(self.values) + sum(map(sys.getsizeof, self.units))
+                + sum(sys.getsizeof(value) for value, unit in zip(self.values, self.units) if value is not unit))
@@ -0,0 +1,176 @@
+import contextlib
+import itertools
+import weakref
+
+from my_sqlite.error import ProgrammingError, TransactionError
+from my_sqlite.query import Batch
+from my_sqlite.runner import QueryRunner
+
+
+def connect(database_path):
+    return Connection(database_path)
+
+
+class Connection:
+    # Runs statements against one database from within a program, in the manner of the Python DB-API. Each connection
+    # has transactions of its own, as each session of a server: its batch is made the current one while its statements
+    # run and their rows are fetched.
+    _open = weakref.WeakSet()
+
+    def __init__(self, database_path):
+        self.database_path = str(database_path)
+        # The state of the batch of the connection, which is only the current one while the connection runs
+        self._batch = None
+        # The cursors of the connection, which are closed with it
+        self._cursors = weakref.WeakSet()
+        self._closed = False
+        Connection._open.add(self)
+
+    def cursor(self):
+        self._check_open()
+        cursor = Cursor(self)
+        self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, query_text, parameters=()):
+        return self.cursor().execute(query_text, parameters)
+
+    def commit(self):
+        self._check_open()
+        with self.batched():
+            if Batch.active():
+                QueryRunner.run('COMMIT', database_path=self.database_path)
+
+    def rollback(self):
+        self._check_open()
+        with self.batched():
+            if Batch.active():
+                QueryRunner.run('ROLLBACK', database_path=self.database_path)
+
+    @contextlib.contextmanager
+    def batched(self, query=None):
+        # Makes the batch of the connection the current one while its statements run, and their rows are fetched
+        previous_batch = Batch.swap(self._batch)
+        try:
+            if query is not None:
+                self._check_batches(query, previous_batch)
+            yield
+        finally:
+            self._batch = Batch.swap(previous_batch)
+
+    def _check_batches(self, query, previous_batch):
+        # Connections share the locks of the process, so a table that the batch of another connection, or that of the
+        # process, writes to is kept from this one here
+        if not query.writes:
+            return
+        batches = [previous_batch] + [connection._batch for connection in list(self._open) if connection is not self]
+        for table in query.tables:
+            if any(table.path in Batch.paths(batch) for batch in batches):
+                raise TransactionError(f'cannot write to {table.name} - a transaction of another connection writes '
+                                       f'to it')
+
+    def _check_open(self):
+        if self._closed:
+            raise ProgrammingError('cannot operate on a closed connection')
+
+    def close(self):
+        # Closing a connection again does nothing, while any other use of a closed connection raises an error
+        if self._closed:
+            return
+        for cursor in list(self._cursors):
+            cursor.close()
+        self.rollback()
+        self._closed = True
+        Connection._open.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Statements run within the context are committed if it exits normally, and rolled back otherwise
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+class Cursor:
+    arraysize = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self._rows = None
+        self._checked_out = None
+
+    def execute(self, query_text, parameters=()):
+        # The rows of a result, as tuples of units, are only read as they are fetched; the plan of the statement is
+        # kept out of the cache until then, so that running the statement again does not disturb them
+        self.close()
+        self.connection._check_open()
+        key, plan = QueryRunner.checkout(query_text, self.connection.database_path)
+        try:
+            with self.connection.batched(plan.query):
+                plan.query.bind(parameters)
+                rows = plan.query.rows()
+                if rows is None:
+                    with plan.query.locked():
+                        plan.query.run()
+        except BaseException:
+            QueryRunner.release(key, plan)
+            raise
+        if rows is None:
+            QueryRunner.release(key, plan)
+            return self
+        self.description = tuple((name, None, None, None, None, None, None) for name in plan.query.column_names)
+        self._rows, self._checked_out = self._locked(plan.query, rows), (key, plan)
+        return self
+
+    def executemany(self, query_text, seq_of_parameters):
+        for parameters in seq_of_parameters:
+            self.execute(query_text, parameters)
+        return self
+
+    @staticmethod
+    def _locked(query, rows):
+        # Other processes may not change the tables while rows are fetched from them, from the first fetch to the last,
+        # or until the cursor is closed
+        with query.locked():
+            yield from rows
+
+    def fetchone(self):
+        return next(self, None)
+
+    def fetchmany(self, size=None):
+        return list(itertools.islice(self, self.arraysize if size is None else size))
+
+    def fetchall(self):
+        return list(self)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._rows is None:
+            raise StopIteration
+        try:
+            with self.connection.batched():
+                return next(self._rows)
+        except BaseException:
+            self._release()
+            raise
+
+    def close(self):
+        self._release()
+        self.description = None
+
+    def __del__(self):
+        self._release()
+
+    def _release(self):
+        if self._rows is not None:
+            self._rows.close()
+        if self._checked_out is not None:
+            QueryRunner.release(*self._checked_out)
+        self._rows, self._checked_out = None, None
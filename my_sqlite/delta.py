@@ -0,0 +1,87 @@
+from config.config import Config
+from my_sqlite import storage
+
+
+class DeltaLog:
+    _file_extension = Config.delta_log_filename_extension
+    _unit_sep = Config.unit_separator
+    _record_sep = Config.record_separator
+    _deletion, _replacement = '-', '+'
+    _loaded = {}
+
+    def __init__(self, table_path, stamp, changes):
+        self.table_path = table_path
+        self.stamp = stamp
+        # Maps the byte offset of a record of the table file to its replacement, or to None if it was deleted
+        self.changes = changes
+        self._replacement_ids = None
+
+    @classmethod
+    def path_of(cls, table_path):
+        return table_path.with_suffix(cls._file_extension)
+
+    @classmethod
+    def stamp_of(cls, table_path):
+        try:
+            return storage.stamp(cls.path_of(table_path))
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def load(cls, table_path):
+        stamp = cls.stamp_of(table_path)
+        if stamp is None:
+            cls._loaded.pop(table_path, None)
+            return None
+        log = cls._loaded.get(table_path)
+        if log is None or log.stamp != stamp:
+            log = cls(table_path, stamp, {})
+            with open(cls.path_of(table_path)) as log_file:
+                log._add(record.split(cls._unit_sep) for record in storage.split_records(log_file))
+            cls._loaded[table_path] = log
+        return log
+
+    @classmethod
+    def append(cls, table_path, changes):
+        # changes is a sequence of (offset, record) pairs, where a record of None stands for a deletion
+        records = [[cls._deletion, str(offset)] if record is None else [cls._replacement, str(offset), *record]
+                   for offset, record in changes]
+        log = cls.load(table_path) or cls(table_path, None, {})
+        with open(cls.path_of(table_path), 'a') as log_file:
+            log_file.write(''.join(f'{cls._unit_sep.join(record)}{cls._record_sep}' for record in records))
+        log._add(records)
+        log.stamp = cls.stamp_of(table_path)
+        cls._loaded[table_path] = log
+        return log
+
+    @classmethod
+    def remove(cls, table_path):
+        cls._loaded.pop(table_path, None)
+        try:
+            cls.path_of(table_path).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _add(self, records):
+        self._replacement_ids = None
+        for kind, offset, *record in records:
+            self.changes[int(offset)] = record if kind == self._replacement else None
+
+    def merge(self, offset_records):
+        for offset, record in offset_records:
+            record = self.changes.get(offset, record)
+            if record is not None:
+                yield offset, record
+
+    def replaced_offsets(self):
+        return (offset for offset, record in self.changes.items() if record is not None)
+
+    def has_id(self, id_, primary_index):
+        offset = primary_index.offsets.get(id_)
+        if offset is not None:
+            record = self.changes.get(offset, [id_])
+            if record is not None and record[0] == id_:
+                return True
+        if self._replacement_ids is None:
+            self._replacement_ids = {record[0] for record in self.changes.values() if record is not None}
+        return id_ in self._replacement_ids
@@ -48,6 +48,24 @@ class UpdateError(Exception):
         return f'Error: {self.message}'
 
 
+class TransactionError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+    def __str__(self):
+        return f'Error: {self.message}'
+
+
+class ProgrammingError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+    def __str__(self):
+        return f'Error: {self.message}'
+
+
 class QuerySyntaxError(Exception):
     def __init__(self, message):
         super().__init__(message)
@@ -57,6 +75,16 @@ class QuerySyntaxError(Exception):
         return f'Error: {self.message}: syntax error'
 
 
+class RemoteError(Exception):
+    # An error reported by a server, whose message is already formatted as the other errors are
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
 def translate_key_error(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
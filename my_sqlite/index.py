@@ -0,0 +1,227 @@
+import bisect
+import collections
+import itertools
+import operator
+from abc import ABC, abstractmethod
+
+from config.config import Config
+from my_sqlite import storage
+from my_sqlite.conversion import converted
+
+
+class Index(ABC):
+    _unit_sep = Config.unit_separator
+    _record_sep = Config.record_separator
+    _loaded = {}
+
+    def __init__(self, table_path, column, stamp):
+        self.table_path = table_path
+        self.column = column
+        self.stamp = stamp
+
+    @classmethod
+    def load(cls, table_path, column):
+        stamp = storage.stamp(table_path)
+        index = cls._loaded.get(cls.path_of(table_path, column))
+        if index is None or index.stamp != stamp:
+            index = cls._read(table_path, column, stamp) or cls.build(table_path, column)
+        cls._loaded[index.path] = index
+        return index
+
+    @classmethod
+    def build(cls, table_path, column):
+        index = cls(table_path, column, storage.stamp(table_path))
+        index._add([index._entry(unit, offset) for offset, unit in storage.offset_units(table_path, column)])
+        storage.write_atomically(index.path, index._serialize(index._entries()))
+        cls._loaded[index.path] = index
+        return index
+
+    @classmethod
+    def _read(cls, table_path, column, stamp):
+        # The index file is a sequence of entries; each write is terminated by the stamp of the table it brought the
+        # index up to date with, as a record of three units, the first one being empty
+        index = cls(table_path, column, stamp)
+        try:
+            with open(index.path) as index_file:
+                records = [record.split(cls._unit_sep) for record in storage.split_records(index_file)]
+        except FileNotFoundError:
+            return None
+        if not records or records[-1] != ['', str(stamp.mtime), str(stamp.size)]:
+            return None
+        index._add([cls._parse(record) for record in records if len(record) != 3 or record[0]])
+        return index
+
+    @property
+    def path(self):
+        return self.path_of(self.table_path, self.column)
+
+    def extend(self, records, offsets):
+        entries = [self._entry(record[self.column], offset) for record, offset in zip(records, offsets)]
+        self.stamp = storage.stamp(self.table_path)
+        self._add(entries)
+        with open(self.path, 'a') as index_file:
+            index_file.write(self._serialize(entries))
+
+    def _serialize(self, entries):
+        records = itertools.chain(map(self._format, entries),
+                                  (('', str(self.stamp.mtime), str(self.stamp.size)),))
+        return ''.join(f'{self._unit_sep.join(record)}{self._record_sep}' for record in records)
+
+    @classmethod
+    @abstractmethod
+    def path_of(cls, table_path, column):
+        pass
+
+    @abstractmethod
+    def lookup(self, symbol, value):
+        pass
+
+    @abstractmethod
+    def _entry(self, unit, offset):
+        pass
+
+    @abstractmethod
+    def _add(self, entries):
+        pass
+
+    @abstractmethod
+    def _entries(self):
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def _format(entry):
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def _parse(record):
+        pass
+
+
+class PrimaryKeyIndex(Index):
+    _file_extension = Config.primary_index_filename_extension
+
+    def __init__(self, table_path, column, stamp):
+        super().__init__(table_path, column, stamp)
+        self.offsets = {}
+        self._offsets_by_value = None
+
+    @classmethod
+    def load(cls, table_path, column=0):
+        return super().load(table_path, column)
+
+    @classmethod
+    def build(cls, table_path, column=0):
+        return super().build(table_path, column)
+
+    @classmethod
+    def path_of(cls, table_path, column):
+        return table_path.with_suffix(cls._file_extension)
+
+    def __contains__(self, id_):
+        return id_ in self.offsets
+
+    def lookup(self, symbol, value):
+        if symbol != '=':
+            return None
+        if self._offsets_by_value is None:
+            self._offsets_by_value = collections.defaultdict(list)
+            for id_, offset in self.offsets.items():
+                self._offsets_by_value[converted(id_)].append(offset)
+        return sorted(self._offsets_by_value.get(value, ()))
+
+    def _entry(self, unit, offset):
+        return unit, offset
+
+    def _add(self, entries):
+        self.offsets.update(entries)
+        if self._offsets_by_value is not None:
+            for id_, offset in entries:
+                self._offsets_by_value[converted(id_)].append(offset)
+
+    def _entries(self):
+        return self.offsets.items()
+
+    @staticmethod
+    def _format(entry):
+        id_, offset = entry
+        return id_, str(offset)
+
+    @staticmethod
+    def _parse(record):
+        id_, offset = record
+        return id_, int(offset)
+
+
+class SecondaryIndex(Index):
+    _file_extension = Config.index_filename_extension
+    _symbols = {'<', '<=', '=', '>=', '>'}
+    _types = {'i': int, 'f': float, 's': str}
+    _nan_range = 2
+
+    def __init__(self, table_path, column, stamp):
+        super().__init__(table_path, column, stamp)
+        self._keys = []
+        self._offsets = []
+
+    @classmethod
+    def path_of(cls, table_path, column):
+        return table_path.with_suffix(f'.{column}{cls._file_extension}')
+
+    @classmethod
+    def columns(cls, table_path):
+        paths = table_path.parent.glob(f'{table_path.stem}.*{cls._file_extension}')
+        return sorted(int(column) for column in (path.suffixes[-2][1:] for path in paths) if column.isdigit())
+
+    def lookup(self, symbol, value):
+        if symbol not in self._symbols:
+            return None
+        key = self._sort_key(value)
+        if key[0] == self._nan_range:
+            return []
+        start, end = bisect.bisect_left(self._keys, key[:1]), bisect.bisect_left(self._keys, (key[0] + 1,))
+        low, high = bisect.bisect_left(self._keys, key), bisect.bisect_right(self._keys, key)
+        bounds = {'<': (start, low), '<=': (start, high), '=': (low, high), '>=': (low, end), '>': (high, end)}
+        return sorted(self._offsets[slice(*bounds[symbol])])
+
+    def runs(self):
+        # (key, offsets) pairs for every distinct key of the index, in increasing order of keys
+        for key, entries in itertools.groupby(zip(self._keys, self._offsets), key=operator.itemgetter(0)):
+            yield key, [offset for _, offset in entries]
+
+    @classmethod
+    def _sort_key(cls, value):
+        # Numbers and strings cannot be compared with one another, so each type gets its own range of the index.
+        # NaN compares false with everything, so it gets a range of its own, which lookups never reach.
+        if isinstance(value, str):
+            return 1, value
+        return (0, value) if value == value else (cls._nan_range, '')
+
+    def _entry(self, unit, offset):
+        return self._sort_key(converted(unit)), offset
+
+    def _add(self, entries):
+        if not self._keys:
+            entries.sort()
+            self._keys, self._offsets = [key for key, _ in entries], [offset for _, offset in entries]
+            return
+        for key, offset in entries:
+            position = bisect.bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._offsets.insert(position, offset)
+
+    def _entries(self):
+        return zip(self._keys, self._offsets)
+
+    @classmethod
+    def _format(cls, entry):
+        (range_, value), offset = entry
+        if range_ == cls._nan_range:
+            return 'f', 'nan', str(offset)
+        return type(value).__name__[0], repr(value) if not isinstance(value, str) else value, str(offset)
+
+    @classmethod
+    def _parse(cls, record):
+        type_, value, offset = record
+        return cls._sort_key(cls._types[type_](value)), int(offset)
@@ -0,0 +1,52 @@
+import collections
+import re
+
+Token = collections.namedtuple('Token', ['kind', 'text', 'start', 'end'])
+
+# One token per match, and every character is matched, so that the text is tokenized in a single pass. Quoted values
+# may contain escaped quotes, and the alternatives of their content never overlap, so that they are matched without
+# backtracking. Characters that start no token are 'other' tokens, which are reported by the clause they appear in.
+_token_pattern = re.compile(r'(?P<space>\s+)'
+                            r'|(?P<value>"(?:[^"\\]|\\"|\\(?!"))*")'
+                            r'|(?P<name>[\w.]+)'
+                            r'|(?P<parameter>\?)'
+                            r'|(?P<symbol><=|>=|!=|[<>=(),*])'
+                            r'|(?P<other>.)', re.DOTALL)
+
+OPERATORS = ('<=', '<', '=', '!=', '>=', '>')
+
+
+def tokenize(text):
+    return [Token(match.lastgroup, match.group(), match.start(), match.end())
+            for match in _token_pattern.finditer(text) if match.lastgroup != 'space']
+
+
+def is_keyword(token, keyword):
+    return token.kind == 'name' and token.text.upper() == keyword
+
+
+def is_symbol(token, symbol):
+    return token.kind == 'symbol' and token.text == symbol
+
+
+def split(tokens, symbol=','):
+    # Splits a list of tokens on a symbol; items may be empty
+    items, item = [], []
+    for token in tokens:
+        if token.kind == 'symbol' and token.text == symbol:
+            items.append(item)
+            item = []
+        else:
+            item.append(token)
+    items.append(item)
+    return items
+
+
+def text_of(tokens):
+    # The text of a list of tokens, with a single space wherever the tokens were apart
+    return ''.join(f' {token.text}' if i and token.start > tokens[i - 1].end else token.text
+                   for i, token in enumerate(tokens))
+
+
+def unquoted(token):
+    return token.text[1:-1].replace(r'\"', '"')
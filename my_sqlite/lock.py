@@ -0,0 +1,135 @@
+import contextlib
+import errno
+import os
+
+from config.config import Config
+from my_sqlite.error import TransactionError
+
+try:
+    import fcntl
+except ImportError:
+    # Without POSIX locks, e.g. on Windows, tables are not locked, and processes must not share a database
+    fcntl = None
+
+
+class TableLock:
+    # Each table has a lock file next to it, whose first three bytes are locked with fcntl:
+    # - the writer byte is held exclusively by a process that changes the table, from the time it first reads the table
+    #   to the time its changes are visible, so that writers never lose each other's changes;
+    # - the data byte is held shared by readers while they read the table, its log and its indexes, and exclusively by
+    #   a writer only while it makes its changes visible, by renaming the file it wrote or appending to the table;
+    # - the gate byte is held exclusively by a writer that waits for the data byte, so that readers that come after it
+    #   wait for it rather than keep the data byte shared, and it only waits for the readers that were already reading.
+    # Readers thus never block one another, and only wait for writers while those publish their changes.
+    # Locks are counted per process, since fcntl locks belong to the process, which may take the same lock again.
+    _file_extension = Config.lock_filename_extension
+    _writer, _gate, _data = range(3)
+    _files = {}
+    _held = {}
+
+    @classmethod
+    def path_of(cls, table_path):
+        return table_path.with_suffix(cls._file_extension)
+
+    @classmethod
+    @contextlib.contextmanager
+    def reading(cls, table_paths):
+        with contextlib.ExitStack() as stack:
+            for path in sorted(set(table_paths)):
+                # A process that already reads the table does not queue behind writers, which would wait for it
+                if not cls._held.get((path, cls._data)):
+                    with cls._holding(path, cls._gate, exclusive=False):
+                        cls._acquire(path, cls._data, exclusive=False)
+                else:
+                    cls._acquire(path, cls._data, exclusive=False)
+                stack.callback(cls._release, path, cls._data)
+            yield
+
+    @classmethod
+    @contextlib.contextmanager
+    def writing(cls, table_paths):
+        with contextlib.ExitStack() as stack:
+            for path in sorted(set(table_paths)):
+                stack.enter_context(cls._holding(path, cls._writer, exclusive=True))
+            yield
+
+    @classmethod
+    @contextlib.contextmanager
+    def publishing(cls, table_path):
+        # Expected to be entered by the writer of the table, whose changes readers must not see in part
+        with cls._holding(table_path, cls._gate, exclusive=True), cls._holding(table_path, cls._data, exclusive=True):
+            yield
+
+    @classmethod
+    def acquire_writer(cls, table_path):
+        cls._acquire(table_path, cls._writer, exclusive=True)
+
+    @classmethod
+    def release_writer(cls, table_path):
+        cls._release(table_path, cls._writer)
+
+    @classmethod
+    @contextlib.contextmanager
+    def _holding(cls, table_path, byte, *, exclusive):
+        cls._acquire(table_path, byte, exclusive=exclusive)
+        try:
+            yield
+        finally:
+            cls._release(table_path, byte)
+
+    @classmethod
+    def _acquire(cls, table_path, byte, *, exclusive):
+        modes = cls._held.setdefault((table_path, byte), [])
+        if not any(modes) and (exclusive or not modes):
+            cls._lock(table_path, byte, exclusive)
+        modes.append(exclusive)
+
+    @classmethod
+    def _release(cls, table_path, byte):
+        modes = cls._held[table_path, byte]
+        exclusive = modes.pop()
+        if not modes:
+            del cls._held[table_path, byte]
+            cls._unlock(table_path, byte)
+        elif exclusive and not any(modes):
+            cls._lock(table_path, byte, False)
+
+    @classmethod
+    def _lock(cls, table_path, byte, exclusive):
+        descriptor = None if fcntl is None else cls._file(table_path, exclusive)
+        if descriptor is None:
+            return
+        try:
+            fcntl.lockf(descriptor, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH, 1, byte)
+        except OSError as error:
+            if error.errno == errno.EBADF:
+                raise TransactionError(f'cannot write to table {table_path.stem}, whose lock file is read-only')
+            if error.errno != errno.EDEADLK:
+                raise
+            raise TransactionError(f'cannot lock table {table_path.stem}, which a process that waits for this one '
+                                   f'holds; roll back and try again')
+
+    @classmethod
+    def _unlock(cls, table_path, byte):
+        descriptor = None if fcntl is None else cls._files.get(table_path)
+        if descriptor is not None:
+            fcntl.lockf(descriptor, fcntl.LOCK_UN, 1, byte)
+
+    @classmethod
+    def _file(cls, table_path, exclusive):
+        # Lock files are opened once and never closed, since closing any descriptor of a file releases every fcntl lock
+        # the process holds on it. A process that may not write the lock file, e.g. in a read-only directory, opens it
+        # read-only, which is enough for shared locks; if there is no lock file to open, it reads without locking, as
+        # no writer has locked the table yet.
+        if table_path not in cls._files:
+            path = cls.path_of(table_path)
+            try:
+                cls._files[table_path] = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError as error:
+                if exclusive or error.errno not in (errno.EACCES, errno.EPERM, errno.EROFS):
+                    raise
+                try:
+                    cls._files[table_path] = os.open(path, os.O_RDONLY)
+                except FileNotFoundError:
+                    return None
+        return cls._files[table_path]
@@ -27,3 +27,17 @@ class Operator:
     @classmethod
     def from_symbol(cls, symbol):
         return cls.mapping[symbol]
+
+
+class Condition:
+    def __init__(self, symbol, value):
+        self.symbol = symbol
+        self.value = value
+        self._operator = Operator.from_symbol(symbol)
+
+    def __call__(self, value):
+        return self._operator(value, self.value)
+
+    def __reduce__(self):
+        # Conditions are sent to the processes of parallel scans, but their operators cannot be pickled
+        return Condition, (self.symbol, self.value)
@@ -0,0 +1,135 @@
+import csv
+import json
+import math
+import sys
+from abc import ABC, abstractmethod
+
+from config.config import Config
+from my_sqlite.conversion import converted
+
+
+class ResultFormat(ABC):
+    @staticmethod
+    def from_mode(mode, names):
+        return {'pipe': Pipe, 'csv': Csv, 'tsv': Tsv, 'jsonl': JsonLines}[mode](names)
+
+    def __init__(self, names):
+        self.names = names
+
+    # The line of a row, line feed included
+    @abstractmethod
+    def line(self, row):
+        pass
+
+    # What is written for a result without rows
+    def empty(self):
+        return ''
+
+
+class Pipe(ResultFormat):
+    def line(self, row):
+        return f"{'|'.join(row)}\n"
+
+    def empty(self):
+        # An empty line, as print() wrote when results were printed
+        return '\n'
+
+
+class Csv(ResultFormat):
+    delimiter = ','
+
+    def __init__(self, names):
+        super().__init__(names)
+        # The writer writes each line to this object, which keeps it until it is returned
+        self._writer = csv.writer(self, delimiter=self.delimiter, lineterminator='\n')
+        self._line = None
+
+    def write(self, line):
+        self._line = line
+
+    def line(self, row):
+        self._writer.writerow(row)
+        return self._line
+
+
+class Tsv(Csv):
+    delimiter = '\t'
+
+
+class JsonLines(ResultFormat):
+    # One object per row, keyed by column name; units that are numbers are written as numbers
+    def __init__(self, names):
+        super().__init__(names)
+        self._keys = self._unique(names)
+
+    def line(self, row):
+        return f'{json.dumps(dict(zip(self._keys, map(self._value, row))))}\n'
+
+    @staticmethod
+    def _unique(names):
+        # A name that a result has more than once, as the ids of joined tables, is numbered from its second occurrence
+        # on, e.g. ID, ID_2, so that no unit is lost to another of the same key
+        keys, taken = [], set(names)
+        for name in names:
+            key, number = name, 1
+            while key in keys or number > 1 and key in taken:
+                number += 1
+                key = f'{name}_{number}'
+            keys.append(key)
+        return keys
+
+    @staticmethod
+    def _value(unit):
+        # Only units that are written as the numbers they stand for, so that '007', '1e3' or ' 5' are kept as they are
+        value = converted(unit)
+        if type(value) is int or type(value) is float and math.isfinite(value):
+            return value if str(value) == unit else unit
+        return unit
+
+
+class Output:
+    # The format of the results of SELECT statements and the file they are written to, as set by the .mode and .output
+    # commands; None stands for the standard output
+    modes = ('pipe', 'csv', 'tsv', 'jsonl')
+    _mode = 'pipe'
+    _file = None
+    _chunk_rows = Config.output_chunk_rows
+
+    @classmethod
+    def set_mode(cls, mode):
+        if mode not in cls.modes:
+            raise ValueError(f"unknown mode '{mode}'; expected one of {', '.join(cls.modes)}")
+        cls._mode = mode
+
+    @classmethod
+    def mode(cls):
+        return cls._mode
+
+    @classmethod
+    def set_file(cls, path=None):
+        # The file is truncated, and then written to by every following statement until the output is set again
+        file = None if path is None else open(path, 'w', newline='')
+        if cls._file is not None:
+            cls._file.close()
+        cls._file = file
+
+    @classmethod
+    def write(cls, names, rows):
+        stream = sys.stdout if cls._file is None else cls._file
+        for chunk in cls.chunks(cls._mode, names, rows):
+            stream.write(chunk)
+            stream.flush()
+
+    @classmethod
+    def chunks(cls, mode, names, rows):
+        # The first row is yielded at once, so that it appears before the rest of the result is computed; the others
+        # are yielded in chunks, so that neither every row nor every line is held in memory
+        result_format = ResultFormat.from_mode(mode, names)
+        lines, first = [], True
+        for row in rows:
+            lines.append(result_format.line(row))
+            if first or len(lines) == cls._chunk_rows:
+                yield ''.join(lines)
+                lines.clear()
+            first = False
+        yield result_format.empty() if first else ''.join(lines)
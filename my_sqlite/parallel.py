@@ -0,0 +1,79 @@
+import concurrent.futures
+
+from my_sqlite import storage
+from my_sqlite.conversion import converted
+
+# Functions run by worker processes are given every setting they need as arguments, rather than importing Config, so
+# that the workers do not depend on how the main process was started. They return the number of bytes they read along
+# with their results, which the main process adds to its own, since workers count theirs in storage.bytes_read of
+# their own process.
+
+_executors = {}
+
+
+def executor(workers):
+    if workers not in _executors:
+        _executors[workers] = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    return _executors[workers]
+
+
+def select_ranges(workers, path, ranges, layout, where, columns, *, ordered=True):
+    # Yields the records of the given byte ranges of a table file that satisfy the WHERE clause, in order of the ranges
+    # if ordered is true, and in order of completion otherwise
+    futures = [executor(workers).submit(_select_range, path, start, end, layout, where, columns)
+               for start, end in ranges]
+    for future in futures if ordered else concurrent.futures.as_completed(futures):
+        records, num_bytes = future.result()
+        storage.bytes_read += num_bytes
+        yield from records
+
+
+def matching_spans(workers, path, ranges, layout, where):
+    # (start, end) byte spans of the records of the given byte ranges of a table file that satisfy the WHERE clause
+    futures = [executor(workers).submit(_match_range, path, start, end, layout, where) for start, end in ranges]
+    spans = []
+    for future in futures:
+        range_spans, num_bytes = future.result()
+        storage.bytes_read += num_bytes
+        spans.extend(range_spans)
+    return spans
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as table_file:
+        table_file.seek(start)
+        return table_file.read(end - start)
+
+
+def _select_range(path, start, end, layout, where, columns):
+    (unit_sep, record_sep, encoding, width), (column, condition) = layout, where
+    data = _read_range(path, start, end)
+    lines = data.decode(encoding).split(record_sep)
+    lines.pop()
+    if columns is None:
+        return [units for units in (line.split(unit_sep) for line in lines)
+                if condition(converted(units[column]))], len(data)
+    last, template, records = max(column, *columns), [''] * width, []
+    for line in lines:
+        units = line.split(unit_sep, last + 1)
+        if condition(converted(units[column])):
+            record = template.copy()
+            for projected_column in columns:
+                record[projected_column] = units[projected_column]
+            records.append(record)
+    return records, len(data)
+
+
+def _match_range(path, start, end, layout, where):
+    (unit_sep, record_sep, encoding, _), (column, condition) = layout, where
+    unit_sep, record_sep = unit_sep.encode(encoding), record_sep.encode(encoding)
+    data = _read_range(path, start, end)
+    lines = data.split(record_sep)
+    lines.pop()
+    spans, offset = [], start
+    for line in lines:
+        next_offset = offset + len(line) + len(record_sep)
+        if condition(converted(line.split(unit_sep, column + 1)[column].decode(encoding))):
+            spans.append((offset, next_offset))
+        offset = next_offset
+    return spans, len(data)
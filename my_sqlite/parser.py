@@ -0,0 +1,121 @@
+from my_sqlite.builder import SelectQueryBuilder, UpdateQueryBuilder, DeleteQueryBuilder, InsertQueryBuilder, \
+    CopyQueryBuilder, DescribeQueryBuilder, CreateIndexQueryBuilder, VacuumQueryBuilder, TransactionQueryBuilder, \
+    ExplainQueryBuilder
+from my_sqlite.error import QuerySyntaxError
+from my_sqlite.lexer import tokenize, is_keyword, is_symbol
+
+
+def parse(query_text):
+    return Parser(tokenize(query_text)).statement()
+
+
+class Parser:
+    # The clauses of each statement, named after the parts given to its builder, with the keywords that start them, in
+    # the order in which they may appear
+    select_clauses = (('select', ('SELECT',)), ('from_', ('FROM',)), ('join', ('JOIN',)), ('on', ('ON',)),
+                      ('where', ('WHERE',)), ('group_by', ('GROUP', 'BY')), ('order_by', ('ORDER', 'BY')),
+                      ('limit', ('LIMIT',)))
+    update_clauses = (('update', ('UPDATE',)), ('set_', ('SET',)), ('where', ('WHERE',)))
+    delete_clauses = (('from_', ('DELETE', 'FROM')), ('where', ('WHERE',)))
+    insert_clauses = (('into', ('INSERT', 'INTO')), ('values', ('VALUES',)))
+    copy_clauses = (('copy', ('COPY',)), ('from_', ('FROM',)), ('delimiter', ('DELIMITER',)))
+    create_index_clauses = (('table', ('CREATE', 'INDEX', 'ON')),)
+    # Clauses that may only follow the given clause directly
+    nested_clauses = {'on': 'join'}
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def statement(self):
+        first = self.tokens[0].text.upper() if self.tokens and self.tokens[0].kind == 'name' else None
+        statements = {'DESCRIBE': self.describe, 'SELECT': self.select, 'UPDATE': self.update, 'DELETE': self.delete,
+                      'INSERT': self.insert, 'COPY': self.copy, 'CREATE': self.create_index, 'VACUUM': self.vacuum,
+                      'BEGIN': self.transaction, 'COMMIT': self.transaction, 'END': self.transaction,
+                      'ROLLBACK': self.transaction, 'EXPLAIN': self.explain}
+        if first not in statements:
+            raise self._no_match()
+        return statements[first]()
+
+    def describe(self):
+        if len(self.tokens) < 2:
+            raise self._no_match()
+        return DescribeQueryBuilder.from_parts({'table': self.tokens[1:]})
+
+    def select(self):
+        return SelectQueryBuilder.from_parts(self._clauses(self.select_clauses, required=('select', 'from_')))
+
+    def update(self):
+        return UpdateQueryBuilder.from_parts(self._clauses(self.update_clauses, required=('update', 'set_')))
+
+    def delete(self):
+        return DeleteQueryBuilder.from_parts(self._clauses(self.delete_clauses, required=('from_',)))
+
+    def insert(self):
+        parts = self._clauses(self.insert_clauses, required=('into', 'values'))
+        into, columns = self._parenthesized(parts['into'])
+        if not columns:
+            into, columns = parts['into'], None
+        return InsertQueryBuilder.from_parts({'into': into, 'columns': columns, 'values': parts['values']})
+
+    def copy(self):
+        return CopyQueryBuilder.from_parts(self._clauses(self.copy_clauses, required=('copy', 'from_')))
+
+    def create_index(self):
+        table, column = self._parenthesized(self._clauses(self.create_index_clauses, required=('table',))['table'])
+        if column is None:
+            raise self._no_match()
+        return CreateIndexQueryBuilder.from_parts({'table': table, 'column': column})
+
+    def vacuum(self):
+        return VacuumQueryBuilder.from_parts({'table': self.tokens[1:] or None})
+
+    def transaction(self):
+        if not (len(self.tokens) == 1 or len(self.tokens) == 2 and is_keyword(self.tokens[1], 'TRANSACTION')):
+            raise self._no_match()
+        return TransactionQueryBuilder.from_parts({'statement': self.tokens[:1]})
+
+    def explain(self):
+        # EXPLAIN [ANALYZE] followed by any other statement, which is parsed on its own
+        length = 2 if len(self.tokens) > 1 and is_keyword(self.tokens[1], 'ANALYZE') else 1
+        if len(self.tokens) == length:
+            raise self._no_match()
+        return ExplainQueryBuilder.from_parts({'explain': self.tokens[:length],
+                                               'statement': Parser(self.tokens[length:]).statement()})
+
+    def _clauses(self, clauses, *, required):
+        # Splits the tokens of a statement into its clauses, each running up to the keywords of a following clause.
+        # Keywords only start a clause if the clause before it has some tokens and some token follows them; otherwise
+        # they are part of the clause before them, and the builder reports the syntax error of that clause.
+        tokens, parts = self.tokens, dict.fromkeys(name for name, _ in clauses)
+        current, start, position, following = None, 0, 0, clauses
+        while following and position < len(tokens):
+            for i, (name, keywords) in enumerate(following):
+                end = position + len(keywords)
+                if (end < len(tokens) and (current is None or position > start)
+                        and self.nested_clauses.get(name, current) == current
+                        and all(is_keyword(token, keyword) for token, keyword in zip(tokens[position:end], keywords))):
+                    if current is not None:
+                        parts[current] = tokens[start:position]
+                    current, start, position, following = name, end, end, following[i + 1:]
+                    break
+            else:
+                if current is None:
+                    raise self._no_match()
+                position += 1
+        if current is not None:
+            parts[current] = tokens[start:]
+        if any(parts[name] is None for name in required):
+            raise self._no_match()
+        return parts
+
+    @staticmethod
+    def _parenthesized(tokens):
+        # Splits 'name (...)' into the tokens before the parentheses and those within, or None if there are none
+        opening = next((i for i, token in enumerate(tokens) if is_symbol(token, '(')), 0)
+        if opening == 0 or not is_symbol(tokens[-1], ')'):
+            return tokens, None
+        return tokens[:opening], tokens[opening + 1:-1]
+
+    @staticmethod
+    def _no_match():
+        return QuerySyntaxError('input matches no known query')
@@ -0,0 +1,69 @@
+import contextlib
+import time
+
+from my_sqlite import storage
+
+
+class Profile:
+    # The wall time, rows and bytes read of each operator of a query, as EXPLAIN ANALYZE measures them while the query
+    # runs. Operators hand their rows over through probe, which returns them as they are unless a profile is active, so
+    # that a query that is not profiled only pays for one call per operator, and nothing per row.
+    _active = None
+
+    def __init__(self):
+        # Maps the keys of operators to their measures, which add up every time an operator runs
+        self.operators = {}
+        self._previous = None
+
+    @classmethod
+    def probe(cls, operator, rows):
+        profile = cls._active
+        return rows if profile is None else profile._measured(operator, iter(rows))
+
+    @contextlib.contextmanager
+    def measuring(self, operator):
+        # Measures an operator that does not hand over rows, such as a statement other than SELECT
+        measure = self._measure(operator)
+        start, read = time.perf_counter(), storage.bytes_read
+        try:
+            yield measure
+        finally:
+            measure.time += time.perf_counter() - start
+            measure.bytes += storage.bytes_read - read
+
+    def __enter__(self):
+        self._previous, Profile._active = Profile._active, self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        Profile._active = self._previous
+
+    def _measure(self, operator):
+        measure = self.operators.get(operator)
+        if measure is None:
+            measure = self.operators[operator] = Measure()
+        measure.loops += 1
+        return measure
+
+    def _measured(self, operator, rows):
+        # The time and bytes of an operator include those of the operators it reads from, since they hand over their
+        # rows while it runs
+        measure, clock, end = self._measure(operator), time.perf_counter, object()
+        while True:
+            start, read = clock(), storage.bytes_read
+            row = next(rows, end)
+            measure.time += clock() - start
+            measure.bytes += storage.bytes_read - read
+            if row is end:
+                return
+            measure.rows += 1
+            yield row
+
+
+class Measure:
+    def __init__(self):
+        # The number of times the operator ran, and the totals of all of its runs
+        self.loops = 0
+        self.rows = 0
+        self.time = 0.0
+        self.bytes = 0
@@ -1,14 +1,30 @@
 import collections
+import contextlib
+import csv
+import functools
+import heapq
 import itertools
 import operator
+import os
 import re
+import sys
 from abc import ABC, abstractmethod
 from pathlib import Path
 
 from config.config import Config
+from my_sqlite import parallel, storage
+from my_sqlite.aggregate import Accumulator
+from my_sqlite.catalog import Catalog
+from my_sqlite.columnar import ColumnarTable, converted_unit
 from my_sqlite.conversion import converted
+from my_sqlite.delta import DeltaLog
 from my_sqlite.error import NoSuchTableError, AmbiguousColumnNameError, NoSuchColumnError, translate_key_error, \
-    InsertError, UpdateError
+    InsertError, UpdateError, TransactionError, QuerySyntaxError
+from my_sqlite.index import PrimaryKeyIndex, SecondaryIndex
+from my_sqlite.lock import TableLock
+from my_sqlite.operator import Condition
+from my_sqlite.output import Output
+from my_sqlite.profile import Profile
 
 
 class AbstractQuery(ABC):
@@ -16,21 +32,68 @@ class AbstractQuery(ABC):
     _file_extension = Config.table_filename_extension
     _unit_sep = Config.unit_separator
     _record_sep = Config.record_separator
+    _delta_log = Config.delta_log
+    _compaction_ratio = Config.delta_log_compaction_ratio
+
+    # Whether the query can be run again as it was built, for as long as the headers of its tables are the same
+    cacheable = True
+    # Whether running the query changes its tables, which are then locked against other writers rather than shared
+    writes = False
 
     def __init__(self):
         self.tables = []
         self.table_map = {}
+        # Functions that give their values to the parameters of the query, in order of appearance
+        self._parameter_setters = []
 
     @abstractmethod
     def run(self):
         pass
 
+    # Statements that have a result return an iterator over its rows, as tuples of units, instead of writing them
+    def rows(self):
+        return None
+
+    @property
+    def column_names(self):
+        return ()
+
+    def plan_tree(self):
+        # The operators that the query runs, as EXPLAIN prints them; statements other than SELECT are a single operator
+        statement = re.sub(r'(?<=.)(?=[A-Z])', ' ', type(self).__name__).upper()
+        return PlanNode(key=('statement',), children=(),
+                        description=f"{statement}: {', '.join(table.name for table in self.tables) or '-'}")
+
+    @staticmethod
+    @contextlib.contextmanager
+    def database(path):
+        # Queries built within the context look their tables up in the given database, if any, rather than in the
+        # default one
+        previous_path = AbstractQuery._database_path
+        if path is not None:
+            AbstractQuery._database_path = path
+        try:
+            yield
+        finally:
+            AbstractQuery._database_path = previous_path
+
+    def locked(self):
+        # The lock that other processes must respect while the query runs, or while its rows are read
+        paths = [table.path for table in self.tables]
+        return TableLock.writing(paths) if self.writes else TableLock.reading(paths)
+
+    def bind(self, parameters):
+        parameters = tuple(parameters)
+        if len(parameters) != len(self._parameter_setters):
+            raise QuerySyntaxError(f'{len(self._parameter_setters)} parameters expected, {len(parameters)} supplied')
+        for setter, value in zip(self._parameter_setters, parameters):
+            setter(str(value))
+
     def append_table(self, name):
         table_path = Path(self._database_path) / f'{name}{self._file_extension}'
         if not table_path.is_file():
             raise NoSuchTableError(name)
-        with open(table_path) as table_file:
-            headers = self.strip_and_split(table_file.read().partition(self._record_sep)[0])
+        headers = self.read_headers(table_path)
         self.tables.append(Table(index=len(self.tables),
                                  name=name,
                                  path=table_path,
@@ -41,14 +104,80 @@ class AbstractQuery(ABC):
             name += f'__{len(self.table_map)}'
         self.table_map[name] = len(self.table_map)
 
+    @staticmethod
+    def read_headers(table_path):
+        return Catalog.headers(table_path)
+
+    @staticmethod
+    def _load_indexes(table):
+        return [PrimaryKeyIndex.load(table.path),
+                *(SecondaryIndex.load(table.path, column) for column in SecondaryIndex.columns(table.path))]
+
+    @staticmethod
+    def _rebuild_indexes(table):
+        PrimaryKeyIndex.build(table.path)
+        for column in SecondaryIndex.columns(table.path):
+            SecondaryIndex.build(table.path, column)
+
     @classmethod
-    def _parse_table(cls, table_file):
-        split_file = table_file.read().split(cls._record_sep)
-        records = itertools.islice(split_file, 1, len(split_file) - 1)
-        return map(cls.strip_and_split, records)
+    def _read_records(cls, path, columns=None):
+        # Records that are streamed from disk rather than cached only hold the units of the given columns, if any
+        working = Batch.get(path)
+        return TableCache.read(path, cls._scan, columns) if working is None else iter(working.records)
 
-    def _serialize_table(self, records):
-        return f"{self._unit_sep.join(self.tables[0].headers)}{self._record_sep}{self._serialize_records(records)}"
+    @classmethod
+    def _scan(cls, path, columns=None):
+        log = DeltaLog.load(path)
+        if log is not None:
+            records = (record for _, record in log.merge(cls._scan_offsets(path)))
+            yield from records if columns is None else map(cls._projection(columns, path), records)
+            return
+        with open(path) as table_file:
+            lines = itertools.islice(storage.split_records(table_file), 1, None)
+            yield from map(cls.strip_and_split if columns is None else cls._projection(columns, path), lines)
+
+    @classmethod
+    def _projection(cls, columns, path):
+        # Returns a function that turns a record, or the line of a record, into a record of the same length where only
+        # the units of the given columns are kept, the other ones being empty
+        template = [''] * len(Catalog.headers(path))
+        last = max(columns, default=0)
+
+        def project(record):
+            units = record.split(cls._unit_sep, last + 1) if isinstance(record, str) else record
+            projected = template.copy()
+            for column in columns:
+                projected[column] = units[column]
+            return projected
+
+        return project
+
+    @classmethod
+    def _scan_offsets(cls, path):
+        return ((offset, cls.strip_and_split(record.decode(storage.encoding)))
+                for offset, record in itertools.islice(storage.offset_records(path), 1, None))
+
+    @staticmethod
+    def _id_exists(id_, primary_index, log):
+        return id_ in primary_index if log is None else log.has_id(id_, primary_index)
+
+    def _write_table(self, table, records):
+        written_path = storage.temporary_path(table.path)
+        with open(written_path, 'w') as table_file:
+            table_file.write(self._serialize_table(table, records))
+        self._replace_table(table, written_path, rows=len(records))
+
+    def _replace_table(self, table, written_path, rows=None):
+        # Readers see either the former table, with its log, or the new one
+        with TableLock.publishing(table.path):
+            os.replace(written_path, table.path)
+            DeltaLog.remove(table.path)
+        Catalog.rewritten(table.path, rows)
+        TableCache.invalidate(table.path)
+        self._rebuild_indexes(table)
+
+    def _serialize_table(self, table, records):
+        return f"{self._unit_sep.join(table.headers)}{self._record_sep}{self._serialize_records(records)}"
 
     @classmethod
     def _serialize_records(cls, records):
@@ -61,17 +190,218 @@ class AbstractQuery(ABC):
 
 
 Table = collections.namedtuple('Table', ['index', 'name', 'path', 'header_map', 'headers', 'filters'])
+# An operator of a plan tree, whose key is the one its rows are probed under by EXPLAIN ANALYZE
+PlanNode = collections.namedtuple('PlanNode', ['key', 'description', 'children'])
+
+
+class Parameter:
+    # Stands for a value of a query that is only given when the query is run
+    pass
+
+
+class TableCache:
+    _budget = Config.table_cache_size
+    _columnar = Config.columnar_tables
+    _entries = collections.OrderedDict()
+    _used = 0
+
+    @classmethod
+    def read(cls, path, scan, columns=None):
+        stamp = Version(table=storage.stamp(path), log=DeltaLog.stamp_of(path))
+        entry = cls._entries.get(path)
+        if entry is not None and entry.stamp == stamp:
+            cls._entries.move_to_end(path)
+            yield from entry.records
+            return
+        cls.invalidate(path)
+        if stamp.table.size > cls._budget:
+            yield from scan(path, columns)
+            return
+        # The records are only cached once the scan completes, i.e. not when the caller stops iterating early
+        records = []
+        for record in scan(path):
+            records.append(record)
+            yield record
+        if cls._columnar:
+            records = ColumnarTable.from_records(records)
+            footprint = records.footprint()
+        else:
+            footprint = cls._footprint(records, stamp.table.size)
+        cls._put(path, CacheEntry(stamp=stamp, records=records, footprint=footprint))
+
+    @classmethod
+    def holds(cls, path):
+        entry = cls._entries.get(path)
+        return entry is not None and entry.stamp == Version(table=storage.stamp(path), log=DeltaLog.stamp_of(path))
+
+    @classmethod
+    def invalidate(cls, path):
+        entry = cls._entries.pop(path, None)
+        if entry is not None:
+            cls._used -= entry.footprint
+
+    @classmethod
+    def clear(cls):
+        cls._entries.clear()
+        cls._used = 0
+
+    @classmethod
+    def _put(cls, path, entry):
+        # Scans of the same table that run at once, as in a self-join, each put an entry for it; the last one replaces
+        # the others
+        cls.invalidate(path)
+        if entry.footprint > cls._budget:
+            return
+        while cls._used + entry.footprint > cls._budget:
+            cls._used -= cls._entries.popitem(last=False)[1].footprint
+        cls._entries[path] = entry
+        cls._used += entry.footprint
+
+    @staticmethod
+    def _footprint(records, num_chars):
+        # Estimate of the memory held by a list of records of strings, without visiting every single string
+        num_units = len(records) * len(records[0]) if records else 0
+        return (sys.getsizeof(records) + sum(map(sys.getsizeof, records))
+                + num_units * sys.getsizeof('') + num_chars)
+
+
+Version = collections.namedtuple('Version', ['table', 'log'])
+CacheEntry = collections.namedtuple('CacheEntry', ['stamp', 'records', 'footprint'])
+
+
+class Batch:
+    # Maps the paths of the tables written to during the current batch to their working copies; None outside a batch
+    _tables = None
+
+    @classmethod
+    def begin(cls):
+        if cls._tables is not None:
+            raise TransactionError('cannot start a transaction within a transaction')
+        cls._tables = {}
+
+    @classmethod
+    def end(cls, statement):
+        if cls._tables is None:
+            raise TransactionError(f'cannot {statement.lower()} - no transaction is active')
+        tables, cls._tables = cls._tables, None
+        return tables.values()
+
+    @classmethod
+    def active(cls):
+        return cls._tables is not None
+
+    @classmethod
+    def swap(cls, state):
+        # Makes a state returned by a former swap, or None, the current one, and returns the current one, so that each
+        # session of a server has a batch of its own
+        state, cls._tables = cls._tables, state
+        return state
+
+    @classmethod
+    def paths(cls, state):
+        # The paths of the tables written to by the batch of the given state
+        return () if state is None else state.keys()
+
+    @classmethod
+    def get(cls, path):
+        return None if cls._tables is None else cls._tables.get(path)
+
+    @classmethod
+    def working_copy(cls, table):
+        # The working copy of a table is loaded by the first statement of the batch that writes to it
+        if cls._tables is None:
+            return None
+        if table.path not in cls._tables:
+            # Other processes cannot write to the table until the end of the batch, so its changes are never lost
+            TableLock.acquire_writer(table.path)
+            records = list(AbstractQuery._read_records(table.path))
+            cls._tables[table.path] = WorkingCopy(table=table, records=records, ids={record[0] for record in records})
+        return cls._tables[table.path]
+
+
+WorkingCopy = collections.namedtuple('WorkingCopy', ['table', 'records', 'ids'])
 
 
 class FilteredQuery(AbstractQuery):
+    _scan_workers = Config.scan_workers
+    _parallel_chunk_size = Config.parallel_scan_chunk_size
+    _parallel_min_size = Config.parallel_scan_min_size
+
     @abstractmethod
     def __init__(self):
         super().__init__()
         self._where_filter = lambda row: True
+        self._where = None
 
     def where(self, column, *, condition):
         [key] = self._map_keys(column)
-        self._where_filter = lambda row: condition(converted(row[key.table][key.column]))
+        if isinstance(condition, Condition) and isinstance(condition.value, Parameter):
+            self._parameter_setters.append(lambda value: setattr(condition, 'value', converted(value)))
+        self._where_filter = lambda row: condition(converted_unit(row[key.table], key.column))
+        self._where = Predicate(key=key, condition=condition)
+
+    def _lookup(self, table):
+        # Records of the table that may satisfy the WHERE clause, fetched through an index; None if no index applies
+        offsets = self._lookup_offsets(table)
+        return None if offsets is None else (record for _, record in self._read_offsets(table, offsets))
+
+    def _lookup_offsets(self, table):
+        if self._where is None or self._where.key.table != table.index or Batch.get(table.path) is not None:
+            return None
+        (_, column), condition = self._where
+        if not isinstance(condition, Condition):
+            return None
+        if column == 0 and condition.symbol == '=':
+            index = PrimaryKeyIndex.load(table.path)
+        elif column in SecondaryIndex.columns(table.path):
+            index = SecondaryIndex.load(table.path, column)
+        else:
+            return None
+        offsets = index.lookup(condition.symbol, condition.value)
+        log = DeltaLog.load(table.path)
+        if offsets is not None and log is not None:
+            # Records replaced through the log are only indexed under their former values
+            offsets = sorted(set(offsets).union(log.replaced_offsets()))
+        return offsets
+
+    def _scans_in_parallel(self, table):
+        # Only the file of a table can be split between processes, so the table must not be cached, nor have changes in
+        # a log or a working copy; the condition of the WHERE clause must also be one that can be sent to a process
+        if (self._scan_workers <= 1 or self._where is None or self._where.key.table != table.index
+                or not isinstance(self._where.condition, Condition)):
+            return False
+        return (storage.stamp(table.path).size >= self._parallel_min_size and Batch.get(table.path) is None
+                and DeltaLog.stamp_of(table.path) is None and not TableCache.holds(table.path))
+
+    def _parallel_arguments(self, table):
+        layout = (self._unit_sep, self._record_sep, storage.encoding, len(table.headers))
+        ranges = list(storage.record_ranges(table.path, self._parallel_chunk_size))
+        return self._scan_workers, table.path, ranges, layout, (self._where.key.column, self._where.condition)
+
+    def _read_offsets(self, table, offsets):
+        records = ((offset, self.strip_and_split(record))
+                   for offset, record in storage.read_records_at(table.path, offsets))
+        log = DeltaLog.load(table.path)
+        return records if log is None else log.merge(records)
+
+    def _offset_records(self, table):
+        # (offset, record) pairs of the table that may satisfy the WHERE clause
+        offsets = self._lookup_offsets(table)
+        if offsets is not None:
+            return self._read_offsets(table, offsets)
+        log = DeltaLog.load(table.path)
+        records = self._scan_offsets(table.path)
+        return records if log is None else log.merge(records)
+
+    def _log_changes(self, table, changes):
+        previous_log = DeltaLog.stamp_of(table.path)
+        with TableLock.publishing(table.path):
+            log = DeltaLog.append(table.path, changes)
+        Catalog.changed(table.path, changes, previous_log=previous_log)
+        TableCache.invalidate(table.path)
+        ratio = self._compaction_ratio
+        if ratio is not None and log.stamp.size > ratio * storage.stamp(table.path).size:
+            self._write_table(table, list(self._read_records(table.path)))
 
     def _map_keys(self, *keys):
         return tuple(self._map_key(key) for key in keys)
@@ -105,9 +435,13 @@ class FilteredQuery(AbstractQuery):
 
 
 Key = collections.namedtuple('Key', ['table', 'column'])
+Aggregate = collections.namedtuple('Aggregate', ['function', 'column'])
+Predicate = collections.namedtuple('Predicate', ['key', 'condition'])
 
 
 class Delete(FilteredQuery):
+    writes = True
+
     def __init__(self):
         super().__init__()
 
@@ -116,14 +450,38 @@ class Delete(FilteredQuery):
 
     def run(self):
         table = self.tables[0]
-        with open(table.path) as table_file:
-            records = self._parse_table(table_file)
-            non_deleted_records = [record for record in records if not self._where_filter((record,))]
-        with open(table.path, 'w') as table_file:
-            table_file.write(self._serialize_table(non_deleted_records))
+        working = Batch.working_copy(table)
+        if working is not None:
+            kept_records = []
+            for record in working.records:
+                if self._where_filter((record,)):
+                    working.ids.discard(record[0])
+                else:
+                    kept_records.append(record)
+            working.records[:] = kept_records
+            return
+        if self._scans_in_parallel(table):
+            arguments = self._parallel_arguments(table)
+            spans = parallel.matching_spans(*arguments)
+            if spans and self._delta_log:
+                self._log_changes(table, [(start, None) for start, _ in spans])
+            elif spans:
+                _, _, ranges, _, _ = arguments
+                written_path = storage.temporary_path(table.path)
+                storage.copy_without(table.path, written_path, spans, ranges[-1][1])
+                self._replace_table(table, written_path)
+            return
+        if self._delta_log:
+            self._log_changes(table, [(offset, None) for offset, record in self._offset_records(table)
+                                      if self._where_filter((record,))])
+            return
+        records = self._read_records(table.path)
+        self._write_table(table, [record for record in records if not self._where_filter((record,))])
 
 
 class Insert(AbstractQuery):
+    writes = True
+
     def __init__(self):
         super().__init__()
         self._value_indices = None
@@ -137,7 +495,7 @@ class Insert(AbstractQuery):
     def _translate_columns(self, columns):
         table_header = self.tables[0].header_map
         if columns is None:
-            self._value_indices = tuple(range(len(table_header)))
+            self._value_indices = {i: i for i in range(len(table_header))}
         else:
             self._value_indices = {table_header[column.lower()]: i for i, column in enumerate(columns)}
             if 0 not in self._value_indices:
@@ -149,34 +507,194 @@ class Insert(AbstractQuery):
             raise InsertError(f"table {self.tables[0].name} has {num_columns} columns "
                               f"but {record_len} values were supplied")
         self._insertions = records
+        for record in records:
+            self._parameter_setters.extend(functools.partial(record.__setitem__, i)
+                                           for i, value in enumerate(record) if isinstance(value, Parameter))
 
     def run(self):
         table = self.tables[0]
-        with open(table.path) as table_file:
-            records = self._parse_table(table_file)
-        existing_ids = {record[0] for record in records}
-        record_len = len(table.header_map)
-        records_to_insert = []
-        for insertion in self._insertions:
-            insertion_id = insertion[self._value_indices[0]]
-            if insertion_id in existing_ids:
+        working = Batch.working_copy(table)
+        if working is not None:
+            records_to_insert = self._records_to_insert(table, self._insertions, working.ids.__contains__)
+            working.records.extend(records_to_insert)
+            working.ids.update(record[0] for record in records_to_insert)
+            return
+        indexes = self._load_indexes(table)
+        primary_index, log = indexes[0], DeltaLog.load(table.path)
+        records_to_insert = self._records_to_insert(table, self._insertions,
+                                                    lambda id_: self._id_exists(id_, primary_index, log))
+        with TableLock.publishing(table.path):
+            with open(table.path, 'a') as table_file:
+                table_file.write(self._serialize_records(records_to_insert))
+            TableCache.invalidate(table.path)
+            Catalog.appended(table.path, records_to_insert, start=primary_index.stamp.size)
+            offsets = list(self._offsets(records_to_insert, start=primary_index.stamp.size))
+            for index in indexes:
+                index.extend(records_to_insert, offsets)
+
+    def _records_to_insert(self, table, insertions, id_exists):
+        # Index of the value of each column of the table in an insertion, where the index one past the values gives the
+        # empty unit of the columns without value
+        positions = [self._value_indices.get(i, len(self._value_indices)) for i in range(len(table.header_map))]
+        in_order = positions == list(range(len(positions)))
+        # A table of one column is always given its value, so that itemgetter is never given a single position
+        units = None if in_order else operator.itemgetter(*positions)
+        records_to_insert, inserted_ids = [], set()
+        for insertion in insertions:
+            insertion_id = insertion[positions[0]]
+            if insertion_id in inserted_ids or id_exists(insertion_id):
                 raise InsertError(f"attempting to store more than one record with id '{insertion_id}'; "
                                   f"aborting the insert")
-            existing_ids.add(insertion_id)
-            records_to_insert.append(
-                [insertion[self._value_indices[i]] if i in self._value_indices else '' for i in range(record_len)])
-        with open(table.path, 'a') as table_file:
-            table_file.write(self._serialize_records(records_to_insert))
+            inserted_ids.add(insertion_id)
+            records_to_insert.append(list(insertion) if in_order else list(units([*insertion, ''])))
+        return records_to_insert
+
+    def _offsets(self, records, *, start):
+        for record in records:
+            yield start
+            start += storage.encoded_length(f'{self._unit_sep.join(record)}{self._record_sep}')
+
+
+class Copy(Insert):
+    # The file is read whenever the statement is run, as UTF-8 text; its first line names the columns it gives values to
+    cacheable = False
+    _chunk_records = Config.copy_chunk_records
+    _source_encoding = 'utf-8'
+    # Errors of the file that may be raised at any line, as it is read; they are reported as InsertError
+    _source_errors = (InsertError, UnicodeDecodeError, csv.Error)
+
+    def __init__(self):
+        super().__init__()
+        self._source = None
+        self._delimiter = None
+        # The number of the line of the file that is being read
+        self._line_number = 0
+
+    def copy(self, table):
+        self.append_table(table)
+
+    def from_(self, path):
+        self._source = Path(path)
+        self._delimiter = '\t' if self._source.suffix.lower() == '.tsv' else ','
+
+    def delimiter(self, delimiter):
+        self._delimiter = delimiter
+
+    def run(self):
+        table = self.tables[0]
+        try:
+            source_file = open(self._source, 'rb')
+        except OSError as error:
+            raise InsertError(f'cannot read {self._source}: {error.strerror}')
+        with source_file:
+            rows = csv.reader(self._decoded_lines(source_file), delimiter=self._delimiter)
+            try:
+                columns = next(rows, [])
+            except self._source_errors as error:
+                raise self._insert_error(error)
+            self._translate_columns(columns)
+            working = Batch.working_copy(table)
+            if working is None:
+                self._append(table, self._chunks(rows, len(columns)))
+            else:
+                self._extend(working, self._chunks(rows, len(columns)))
+
+    def _chunks(self, rows, num_columns):
+        chunk = []
+        for row in rows:
+            if not row:
+                continue
+            if len(row) != num_columns:
+                raise InsertError(f'line {rows.line_num} of {self._source} has {len(row)} values '
+                                  f'for {num_columns} columns')
+            chunk.append(row)
+            if len(chunk) == self._chunk_records:
+                yield self._checked(chunk)
+                chunk = []
+        if chunk:
+            yield self._checked(chunk)
+
+    def _checked(self, chunk):
+        units = ''.join(itertools.chain.from_iterable(chunk))
+        if self._unit_sep in units or self._record_sep in units:
+            raise InsertError(f'{self._source} holds a unit or record separator')
+        return chunk
+
+    def _append(self, table, chunks):
+        # Each chunk is appended to the table file, and then to its indexes, which thus know the ids of the records
+        # copied so far. If a chunk cannot be copied, the table file is cut back to its former size, and the indexes
+        # are rebuilt when they are next loaded since they no longer match the table file. Readers wait for the whole
+        # file to be copied, so that they never see part of it.
+        indexes = self._load_indexes(table)
+        primary_index, log = indexes[0], DeltaLog.load(table.path)
+        id_exists = primary_index.__contains__ if log is None else lambda id_: log.has_id(id_, primary_index)
+        start = end = primary_index.stamp.size
+        try:
+            with TableLock.publishing(table.path), open(table.path, 'ab') as table_file:
+                for chunk in chunks:
+                    records = self._records_to_insert(table, chunk, id_exists)
+                    lines = [f'{self._unit_sep.join(record)}{self._record_sep}'.encode(storage.encoding)
+                             for record in records]
+                    table_file.write(b''.join(lines))
+                    table_file.flush()
+                    Catalog.appended(table.path, records, start=end)
+                    offsets = []
+                    for line in lines:
+                        offsets.append(end)
+                        end += len(line)
+                    for index in indexes:
+                        index.extend(records, offsets)
+        except self._source_errors as error:
+            if end != start:
+                os.truncate(table.path, start)
+            raise self._insert_error(error)
+        finally:
+            TableCache.invalidate(table.path)
+
+    def _extend(self, working, chunks):
+        num_records = len(working.records)
+        try:
+            for chunk in chunks:
+                records = self._records_to_insert(working.table, chunk, working.ids.__contains__)
+                working.records.extend(records)
+                working.ids.update(record[0] for record in records)
+        except self._source_errors as error:
+            working.ids.difference_update(record[0] for record in working.records[num_records:])
+            del working.records[num_records:]
+            raise self._insert_error(error)
+
+    def _decoded_lines(self, source_file):
+        # Lines are decoded one at a time, so that a line that is not valid text is known
+        for self._line_number, line in enumerate(source_file, 1):
+            yield line.decode(self._source_encoding)
+
+    def _insert_error(self, error):
+        if isinstance(error, InsertError):
+            return error
+        if isinstance(error, UnicodeDecodeError):
+            return InsertError(f'line {self._line_number} of {self._source} is not {self._source_encoding} text')
+        return InsertError(f'line {self._line_number} of {self._source}: {error}')
 
 
 class Select(FilteredQuery):
+    _join_block_size = Config.join_block_size
+    _join_buffer_records = Config.join_buffer_records
+
     def __init__(self):
         super().__init__()
         self._on_keys = None
+        self._join_filter = None
+        self._where_table_filter = None
+        self._used_keys = set()
+        self._group_keys = None
+        self._aggregates = None
         self._select_keys = None
+        self._select_names = None
         self._order_keys = []
         self._order_ascending = True
         self._limit = None
+        # What EXPLAIN says of the filters of the tables and of the join, but for the WHERE clause
+        self._filter_descriptions = {}
 
     def from_(self, table):
         self.append_table(table)
@@ -189,61 +707,366 @@ class Select(FilteredQuery):
     def _on(self, join_keys):
         key1, key2 = self._map_keys(*join_keys)
         if key1.table == key2.table:
-            self.tables[key1.table].filters.append(lambda record: record[key1.column] == record[key2.column])
+            table_filter = lambda record: record[key1.column] == record[key2.column]
+            self.tables[key1.table].filters.append(table_filter)
+            self._filter_descriptions[table_filter] = ' = '.join(join_keys)
         else:
             self._on_keys = tuple(key.column for key in sorted((key1, key2), key=lambda k: k.table))
 
+    def where(self, column, *, condition):
+        super().where(column, condition=condition)
+        # The WHERE clause only references one table, so it is applied while that table is read, before the join
+        key = self._where.key
+        self._where_table_filter = lambda record: condition(converted_unit(record, key.column))
+        self.tables[key.table].filters.append(self._where_table_filter)
+
+    def where_equal(self, column1, column2):
+        # Without an ON clause, an equality between columns of the two tables of a join is the same as an ON clause
+        key1, key2 = self._map_keys(column1, column2)
+        if key1.table == key2.table or self._on_keys is None:
+            self._on((column1, column2))
+        else:
+            self._join_filter = lambda row: row[key1.table][key1.column] == row[key2.table][key2.column]
+            self._filter_descriptions[self._join_filter] = f'{column1} = {column2}'
+
+    def group_by(self, columns):
+        self._group_keys = self._map_keys(*columns)
+
     def select(self, columns):
+        columns = tuple(columns)
+        if self._group_keys is not None or any(isinstance(column, Aggregate) for column in columns):
+            self._aggregates = []
+            self._select_keys = tuple(map(self._result_key, columns))
+            self._select_names = tuple(
+                f"{column.function}({'*' if column.column is None else column.column})"
+                if isinstance(column, Aggregate) else self._column_name(self._map_key(column)) for column in columns)
+            return
         key_groups = []
         for column in columns:
             matches = re.match(r'(|(?P<table>.+)\.)(?=\*$)', column)
             key_groups.append(self._map_keys(column) if matches is None
                               else self._get_key_set(matches.groupdict()['table']))
         self._select_keys = tuple(itertools.chain.from_iterable(key_groups))
+        self._select_names = tuple(map(self._column_name, self._select_keys))
+
+    def _column_name(self, key):
+        return self.tables[key.table].headers[key.column]
 
     def order_by(self, ordering_terms):
         columns, ascendings = zip(*ordering_terms)
-        self._order_keys = tuple(zip(self._map_keys(*columns), map(operator.not_, ascendings)))
+        keys = self._map_keys(*columns) if self._aggregates is None else tuple(map(self._result_key, columns))
+        self._order_keys = tuple(zip(keys, map(operator.not_, ascendings)))
+
+    def _result_key(self, column):
+        # The records of the result of an aggregation hold the GROUP BY columns, followed by the aggregates
+        group_keys = self._group_keys or ()
+        if isinstance(column, Aggregate):
+            aggregate = Aggregate(column.function, None if column.column is None else self._map_key(column.column))
+            if aggregate not in self._aggregates:
+                self._aggregates.append(aggregate)
+            return Key(0, len(group_keys) + self._aggregates.index(aggregate))
+        if column.endswith('*'):
+            raise QuerySyntaxError('* cannot be selected along with GROUP BY or aggregate functions')
+        key = self._map_key(column)
+        if key not in group_keys:
+            raise QuerySyntaxError(f'{column} must appear in the GROUP BY clause or be used in an aggregate function')
+        return Key(0, group_keys.index(key))
 
     def limit(self, limit):
         self._limit = limit if limit >= 0 else None
 
+    def _map_key(self, key):
+        key = super()._map_key(key)
+        self._used_keys.add(key)
+        return key
+
+    def _columns(self, table):
+        # The columns of the table that the query reads, or None if it reads all of them
+        keys = self._used_keys if self._aggregates is not None else self._used_keys.union(self._select_keys)
+        columns = sorted({column for index, column in keys if index == table.index})
+        return None if len(columns) == len(table.headers) else columns
+
     def run(self):
-        joined_rows = filter(self._where_filter, self._get_rows())
-        result = ((row[table][column] for table, column in self._select_keys)
-                  for row in itertools.islice(self._order(joined_rows), self._limit))
-        print(*('|'.join(row) for row in result), sep='\n')
+        Output.write(self.column_names, self.rows())
+
+    def rows(self):
+        # The tables are only read as the rows are iterated over. Each operator hands its rows over through a probe of
+        # EXPLAIN ANALYZE, under the key of its node in the plan tree; the projection is probed by EXPLAIN itself.
+        rows = self._get_rows()
+        if self._join_filter is not None:
+            rows = Profile.probe(('join filter',), filter(self._join_filter, rows))
+        if self._aggregates is not None:
+            rows = Profile.probe(('aggregate',), zip(self._aggregate(rows)))
+        if self._order_keys:
+            rows = Profile.probe(('sort',), self._order(rows))
+        if self._limit is not None:
+            rows = Profile.probe(('limit',), itertools.islice(rows, self._limit))
+        for row in rows:
+            yield tuple(row[table][column] for table, column in self._select_keys)
+
+    @property
+    def column_names(self):
+        return self._select_names
 
     def _get_rows(self):
-        tables = []
-        for table in self.tables:
-            with open(table.path) as table_file:
-                tables.append(
-                    row for row in self._parse_table(table_file) if not table.filters or table.filters[0](row))
+        if len(self.tables) == 1:
+            return zip(self._filtered_records(self.tables[0]))
         if self._on_keys is None:
-            return itertools.product(*tables)
-        groups_left, groups_right = self._get_groups(tables)
-        return itertools.chain.from_iterable(
-            itertools.product(groups_left[key], groups_right[key]) for key in groups_left)
-
-    def _get_groups(self, tables):
-        groups = [collections.defaultdict(list), collections.defaultdict(list)]
-        for index in range(2):
-            for record in tables[index]:
-                groups[index][record[self._on_keys[index]]].append(record)
+            return Profile.probe(('join',), self._nested_loop_join())
+        indexes = self._merge_join_indexes()
+        return Profile.probe(('join',), self._hash_join() if indexes is None else self._merge_join(indexes))
+
+    def _filtered_records(self, table, records=None):
+        filters = table.filters
+        if records is None:
+            records = self._lookup(table)
+        if records is None and self._scans_in_parallel(table):
+            records = parallel.select_ranges(*self._parallel_arguments(table), self._columns(table),
+                                             ordered=not self._order_keys)
+            filters = [table_filter for table_filter in filters if table_filter is not self._where_table_filter]
+        if records is None:
+            records = self._read_records(table.path, self._columns(table))
+        records = Profile.probe(('scan', table.index), records)
+        for table_filter in filters:
+            records = filter(table_filter, records)
+        return Profile.probe(('filter', table.index), records) if filters else records
+
+    def _nested_loop_join(self):
+        # Only a block of the first table is held in memory at a time, along with the second table if it is small enough
+        outer = self._filtered_records(self.tables[0])
+        buffered, complete = [], False
+        for block in iter(lambda: list(itertools.islice(outer, self._join_block_size)), []):
+            for record in buffered if complete else self._filtered_records(self.tables[1]):
+                if buffered is not None and not complete:
+                    buffered.append(record)
+                    if len(buffered) > self._join_buffer_records:
+                        buffered = None
+                for outer_record in block:
+                    yield outer_record, record
+            complete = buffered is not None
+            if complete and not buffered:
+                return
+
+    def _hash_join(self):
+        # Only one input is held in memory, while the other one is streamed against it. The input read through an
+        # index is expected to be the smallest; otherwise, the table with the fewest records, as the catalog counts them.
+        lookups = [self._lookup(table) for table in self.tables]
+        build = self._build_input([records is not None for records in lookups])
+        probe = 1 - build
+        inputs = [self._filtered_records(table, records) for table, records in zip(self.tables, lookups)]
+        groups = collections.defaultdict(list)
+        for record in inputs[build]:
+            groups[record[self._on_keys[build]]].append(record)
+        if not groups:
+            return
+        column = self._on_keys[probe]
+        for record in inputs[probe]:
+            for match in groups.get(record[column], ()):
+                yield (match, record) if build == 0 else (record, match)
+
+    def _build_input(self, looked_up):
+        return min(range(2), key=lambda i: (not looked_up[i], Catalog.statistics(self.tables[i].path).rows))
+
+    def _merge_join_indexes(self):
+        # Both join columns must be indexed, and the indexes must describe the table files as they are read
+        if self._where is not None and self._lookup_offsets(self.tables[self._where.key.table]) is not None:
+            return None
+        if not self._merge_join_cheaper():
+            return None
+        indexes = []
+        for table, column in zip(self.tables, self._on_keys):
+            if (column not in SecondaryIndex.columns(table.path) or Batch.get(table.path) is not None
+                    or DeltaLog.stamp_of(table.path) is not None):
+                return None
+            indexes.append(SecondaryIndex.load(table.path, column))
+        return indexes
+
+    def _merge_join_cheaper(self):
+        # The hash join reads both table files once, and holds the records of the smaller table in memory. The merge
+        # join only holds the records of one key at a time, but reads the records of each key on their own, a read of
+        # about two records each time. It is only chosen when the smaller table has more records than a join may hold
+        # in memory, or when it reads fewer bytes, i.e. when most records are not joined.
+        statistics = [Catalog.statistics(table.path) for table in self.tables]
+        if min(table.rows for table in statistics) > self._join_buffer_records:
+            return True
+        merge_bytes = sum(table.rows * self._record_read_size(table) for table in statistics)
+        return merge_bytes < sum(table.size for table in statistics)
+
+    @staticmethod
+    def _record_read_size(statistics):
+        return max(2 * statistics.size // max(statistics.rows, 1), 64)
+
+    def _merge_join(self, indexes):
+        # Walks both indexes in order of keys, so that only the records sharing one key are held in memory at a time.
+        # Keys are converted values, whereas the join compares units, so the records of a key are grouped by unit.
+        # Each table file is opened once for the whole walk, and records close to the last ones read are read from the
+        # same buffer.
+        with contextlib.ExitStack() as stack:
+            readers = [stack.enter_context(storage.RecordReader(
+                table.path, self._record_read_size(Catalog.statistics(table.path)))) for table in self.tables]
+            runs = [index.runs() for index in indexes]
+            current = [next(runs[0], None), next(runs[1], None)]
+            while current[0] is not None and current[1] is not None:
+                (left_key, left_offsets), (right_key, right_offsets) = current
+                if left_key < right_key:
+                    current[0] = next(runs[0], None)
+                    continue
+                if right_key < left_key:
+                    current[1] = next(runs[1], None)
+                    continue
+                groups = [self._unit_groups(table, column, offsets, reader) for table, column, offsets, reader
+                          in zip(self.tables, self._on_keys, (left_offsets, right_offsets), readers)]
+                for unit, records in groups[0].items():
+                    yield from itertools.product(records, groups[1].get(unit, ()))
+                current = [next(runs[0], None), next(runs[1], None)]
+
+    def _unit_groups(self, table, column, offsets, reader):
+        # The tables of a merge join have no log, so that their records are those of the table file
+        groups = collections.defaultdict(list)
+        records = (self.strip_and_split(record) for _, record in reader.read(sorted(offsets)))
+        for record in self._filtered_records(table, records):
+            groups[record[column]].append(record)
         return groups
 
+    def _aggregate(self, rows):
+        # A single pass over the rows, which only holds one accumulator per aggregate and per group in memory; the
+        # rows are only read once the first group is asked for
+        groups = {}
+        group_keys = self._group_keys or ()
+        for row in rows:
+            group = tuple(row[table][column] for table, column in group_keys)
+            accumulators = groups.get(group)
+            if accumulators is None:
+                accumulators = groups[group] = [Accumulator.from_function(function) for function, _ in self._aggregates]
+            for accumulator, (_, key) in zip(accumulators, self._aggregates):
+                if key is None:
+                    accumulator.add(row, None)
+                else:
+                    accumulator.add(row[key.table], key.column)
+        if not groups and self._group_keys is None:
+            groups[()] = [Accumulator.from_function(function) for function, _ in self._aggregates]
+        for group, accumulators in groups.items():
+            yield [*group, *(accumulator.result() for accumulator in accumulators)]
+
     def _order(self, rows):
-        for key, reverse in reversed(self._order_keys):
-            def sort_key(row):
-                value = converted(row[key.table][key.column])
-                return (value != '' if reverse else value == ''), value
+        # Like _aggregate, a generator, so that its input is only read once its first row is asked for
+        if self._limit is not None:
+            yield from heapq.nsmallest(self._limit, rows, key=self._sort_key)
+        else:
+            yield from sorted(rows, key=self._sort_key)
+
+    def plan_tree(self):
+        # The same choices as rows() makes, which only read indexes and the statistics of the catalog
+        if len(self.tables) == 1:
+            node = self._table_plan(self.tables[0])
+        else:
+            indexes = None if self._on_keys is None else self._merge_join_indexes()
+            inputs = tuple(self._table_plan(table, walked=indexes is not None) for table in self.tables)
+            node = PlanNode(key=('join',), description=self._join_description(indexes), children=inputs)
+        if self._join_filter is not None:
+            node = PlanNode(key=('join filter',), description=f'Filter: {self._filter_descriptions[self._join_filter]}',
+                            children=(node,))
+        if self._aggregates is not None:
+            names = self._result_names()[len(self._group_keys or ()):]
+            group_names = ', '.join(map(self._column_name, self._group_keys or ()))
+            node = PlanNode(key=('aggregate',), children=(node,),
+                            description=f"Aggregate: {', '.join(names)}{f' by {group_names}' if group_names else ''}")
+        if self._order_keys:
+            names = self._result_names() if self._aggregates is not None else None
+            terms = ', '.join(f"{self._column_name(key) if names is None else names[key.column]}{' DESC' * reverse}"
+                              for key, reverse in self._order_keys)
+            top = '' if self._limit is None else f' (top {self._limit} kept in a heap)'
+            node = PlanNode(key=('sort',), description=f'Sort: {terms}{top}', children=(node,))
+        if self._limit is not None:
+            node = PlanNode(key=('limit',), description=f'Limit: {self._limit}', children=(node,))
+        return PlanNode(key=('project',), description=f"Project: {', '.join(self._select_names)}", children=(node,))
+
+    def _result_names(self):
+        # The names of the columns of the records of an aggregation
+        return [*map(self._column_name, self._group_keys or ()),
+                *(f"{function}({'*' if key is None else self._column_name(key)})"
+                  for function, key in self._aggregates)]
+
+    def _join_description(self, indexes):
+        names = [table.name for table in self.tables]
+        if self._on_keys is None:
+            return f'Nested loop join: blocks of {self._join_block_size} records of {names[0]} against {names[1]}'
+        on = ' = '.join(f'{table.name}.{table.headers[column]}' for table, column in zip(self.tables, self._on_keys))
+        if indexes is not None:
+            return f'Merge join: {on} (in order of the indexes of both columns)'
+        build = self._build_input([self._lookup_offsets(table) is not None for table in self.tables])
+        return f'Hash join: {on} ({names[build]} held in memory)'
+
+    def _table_plan(self, table, *, walked=False):
+        # The records of a table, as _filtered_records reads them, and its filters
+        filters, offsets = table.filters, None if walked else self._lookup_offsets(table)
+        working = Batch.get(table.path)
+        if walked:
+            description = f'Index walk: {table.name}.{table.headers[self._on_keys[table.index]]}'
+        elif working is not None:
+            description = f'Working copy: {table.name} ({self._count(len(working.records))})'
+        elif offsets is not None:
+            description = f'Index lookup: {table.name} ({self._count(len(offsets))})'
+        elif self._scans_in_parallel(table):
+            workers, _, ranges, *_ = self._parallel_arguments(table)
+            description = (f'Parallel scan: {table.name} '
+                           f"({self._count(len(ranges), 'range')} filtered by {workers} processes)")
+            filters = [table_filter for table_filter in filters if table_filter is not self._where_table_filter]
+        else:
+            cached = TableCache.holds(table.path)
+            columns = None if cached else self._columns(table)
+            details = [self._count(Catalog.statistics(table.path).rows)]
+            if columns is not None:
+                details.append(f'{len(columns)} of {len(table.headers)} columns kept')
+            if DeltaLog.stamp_of(table.path) is not None:
+                details.append('merged with its delta log')
+            description = f"{'Cached records' if cached else 'Scan'}: {table.name} ({', '.join(details)})"
+        node = PlanNode(key=('scan', table.index), description=description, children=())
+        if not filters:
+            return node
+        descriptions = ', '.join(self._where_description() if table_filter is self._where_table_filter
+                                 else self._filter_descriptions[table_filter] for table_filter in filters)
+        return PlanNode(key=('filter', table.index), description=f'Filter: {descriptions}', children=(node,))
+
+    @staticmethod
+    def _count(count, noun='record'):
+        return f"{count} {noun}{'s' * (count != 1)}"
+
+    def _where_description(self):
+        key, condition = self._where
+        if not isinstance(condition, Condition):
+            return f'{self._column_name(key)} satisfies a condition'
+        value = '?' if isinstance(condition.value, Parameter) else f'"{condition.value}"'
+        return f'{self._column_name(key)} {condition.symbol} {value}'
+
+    def _sort_key(self, row):
+        # A flat tuple of (is_empty, is_string, value) triples, so that empty values come last whatever the direction
+        # of the term, and numbers, which cannot be compared with strings, come before them, as in MIN and MAX
+        key = []
+        for (table, column), reverse in self._order_keys:
+            value = converted_unit(row[table], column)
+            key.append(value == '')
+            key.append((type(value) is str) != reverse)
+            key.append(value if not reverse else -value if type(value) is not str else Descending(value))
+        return tuple(key)
 
-            rows = sorted(rows, key=sort_key, reverse=reverse)
-        return rows
+
+class Descending:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value if isinstance(other, Descending) else NotImplemented
+
+    def __lt__(self, other):
+        return other.value < self.value if isinstance(other, Descending) else NotImplemented
 
 
 class Update(FilteredQuery):
+    writes = True
+
     def __init__(self, table):
         super().__init__()
         self.append_table(table)
@@ -253,27 +1076,52 @@ class Update(FilteredQuery):
     def set(self, update_dict):
         header_map = self.tables[0].header_map
         self._update_dict = {header_map[col.lower()]: value for col, value in update_dict.items()}
+        self._parameter_setters.extend(functools.partial(self._update_dict.__setitem__, column)
+                                       for column, value in self._update_dict.items() if isinstance(value, Parameter))
 
     def run(self):
         table = self.tables[0]
-        with open(table.path) as table_file:
-            records = self._parse_table(table_file)
-            updated_records, seen_ids = [], set()
-            for record in records:
-                updated_records.append(self._update(record))
-                if record[0] in seen_ids:
-                    raise UpdateError(
-                        f"Attempting to store more than one record with id '{record[0]}'; refusing to update")
-                seen_ids.add(record[0])
-        with open(table.path, 'w') as table_file:
-            table_file.write(self._serialize_table(updated_records))
+        working = Batch.working_copy(table)
+        if working is not None:
+            positions = [i for i, record in enumerate(working.records) if self._where_filter((record,))]
+            self._check_ids([working.records[i][0] for i in positions], working.ids.__contains__)
+            for i in positions:
+                working.ids.discard(working.records[i][0])
+                working.records[i] = self._update(working.records[i])
+                working.ids.add(working.records[i][0])
+            return
+        id_exists = functools.partial(self._id_exists, primary_index=PrimaryKeyIndex.load(table.path),
+                                      log=DeltaLog.load(table.path))
+        if self._delta_log:
+            matches = [(offset, record) for offset, record in self._offset_records(table)
+                       if self._where_filter((record,))]
+            self._check_ids([record[0] for _, record in matches], id_exists)
+            self._log_changes(table, [(offset, self._update(record)) for offset, record in matches])
+            return
+        updated_records, updated_ids = [], []
+        for record in self._read_records(table.path):
+            if self._where_filter((record,)):
+                updated_ids.append(record[0])
+                record = self._update(record)
+            updated_records.append(record)
+        self._check_ids(updated_ids, id_exists)
+        self._write_table(table, updated_records)
 
     def _update(self, record):
-        if self._where_filter((record,)):
-            for column, value in self._update_dict.items():
-                record[column] = value
+        # Cached records are shared between queries, so they are copied rather than updated in place
+        record = record.copy()
+        for column, value in self._update_dict.items():
+            record[column] = value
         return record
 
+    def _check_ids(self, updated_ids, id_exists):
+        # Every updated record is given the same id, which must not belong to any record left untouched
+        if 0 not in self._update_dict:
+            return
+        new_id = self._update_dict[0]
+        if len(updated_ids) > 1 or updated_ids and updated_ids[0] != new_id and id_exists(new_id):
+            raise UpdateError(f"Attempting to store more than one record with id '{new_id}'; refusing to update")
+
 
 class Describe(AbstractQuery):
     def __init__(self, table):
@@ -282,3 +1130,128 @@ class Describe(AbstractQuery):
 
     def run(self):
         print(*self.tables[0].headers)
+
+    def rows(self):
+        return ((header,) for header in self.tables[0].headers)
+
+    @property
+    def column_names(self):
+        return 'name',
+
+
+class Explain(AbstractQuery):
+    # EXPLAIN writes the plan tree of a statement, one operator per row. EXPLAIN ANALYZE first runs the statement, its
+    # result being formatted but not written, and adds what each operator measured: the wall time spent in it and in the
+    # operators it reads from, its rows in and out, and the bytes it read itself.
+    def __init__(self, query, *, analyze):
+        super().__init__()
+        self.query = query
+        self.analyze = analyze
+        self.tables, self.table_map = query.tables, query.table_map
+        self._parameter_setters = query._parameter_setters
+        self.cacheable = query.cacheable
+        self.writes = query.writes and analyze
+
+    def run(self):
+        Output.write(self.column_names, self.rows())
+
+    def rows(self):
+        # The plan is made before the statement runs, since running it may change how its tables would be read
+        tree, profile = self.query.plan_tree(), None
+        if self.query.column_names:
+            tree = PlanNode(key=('output',), description=f'Output: {Output.mode()}', children=(tree,))
+        if self.analyze:
+            with Profile() as profile:
+                self._run_profiled(profile, tree)
+        for line in self._lines(tree, profile):
+            yield line,
+
+    @property
+    def column_names(self):
+        return 'plan',
+
+    def _run_profiled(self, profile, tree):
+        with profile.measuring(tree.key) as measure:
+            rows = self.query.rows()
+            if rows is None:
+                self.query.run()
+                measure.rows = None
+                return
+            [result] = tree.children
+            for _ in Output.chunks(Output.mode(), self.query.column_names, Profile.probe(result.key, rows)):
+                pass
+        measure.rows = profile.operators[result.key].rows
+
+    def _lines(self, node, profile, depth=0):
+        yield f"{'  ' * depth}{'-> ' if depth else ''}{node.description}{self._measures(node, profile)}"
+        for child in node.children:
+            yield from self._lines(child, profile, depth + 1)
+
+    @staticmethod
+    def _measures(node, profile):
+        if profile is None:
+            return ''
+        measure = profile.operators.get(node.key)
+        if measure is None:
+            return ' (never run)'
+        inputs = [profile.operators[child.key] for child in node.children if child.key in profile.operators]
+        rows_in = f', rows in={sum(child.rows for child in inputs)}' if node.children else ''
+        rows_out = '' if measure.rows is None else f', rows out={measure.rows}'
+        return (f' (time={measure.time * 1000:.3f} ms{rows_in}{rows_out}, '
+                f'bytes read={measure.bytes - sum(child.bytes for child in inputs)}, loops={measure.loops})')
+
+
+class CreateIndex(AbstractQuery):
+    def __init__(self):
+        super().__init__()
+        self._column = None
+
+    @translate_key_error
+    def on(self, table, column):
+        self.append_table(table)
+        self._column = self.tables[0].header_map[column.lower()]
+
+    def run(self):
+        SecondaryIndex.build(self.tables[0].path, self._column)
+
+
+class Vacuum(AbstractQuery):
+    # The tables of a VACUUM statement without table name are those of the database when the statement is built
+    cacheable = False
+    writes = True
+
+    def __init__(self):
+        super().__init__()
+
+    def vacuum(self, table=None):
+        tables = [table] if table is not None else sorted(
+            path.stem for path in Path(self._database_path).glob(f'*{self._file_extension}'))
+        for name in tables:
+            self.append_table(name)
+
+    def run(self):
+        for table in self.tables:
+            if DeltaLog.stamp_of(table.path) is not None:
+                self._write_table(table, list(self._read_records(table.path)))
+
+
+class Transaction(AbstractQuery):
+    def __init__(self):
+        super().__init__()
+        self._statement = None
+
+    def statement(self, statement):
+        self._statement = statement
+
+    def run(self):
+        if self._statement == 'BEGIN':
+            Batch.begin()
+            return
+        working_copies = Batch.end(self._statement)
+        try:
+            if self._statement != 'ROLLBACK':
+                for working in working_copies:
+                    self._write_table(working.table, working.records)
+        finally:
+            for working in working_copies:
+                TableLock.release_writer(working.table.path)
@@ -1,9 +1,17 @@
+import collections
 import functools
+import re
 
-from my_sqlite.builder import SelectQueryBuilder, UpdateQueryBuilder, DeleteQueryBuilder, InsertQueryBuilder, \
-    DescribeQueryBuilder
+from config.config import Config
 from my_sqlite.error import NoSuchTableError, NoSuchColumnError, AmbiguousColumnNameError, InsertError, \
-    QuerySyntaxError, UpdateError
+    QuerySyntaxError, UpdateError, TransactionError
+from my_sqlite.parser import parse
+from my_sqlite.query import AbstractQuery
+
+
+# The errors of statements, which are reported to the user rather than raised
+QUERY_ERRORS = (NoSuchTableError, NoSuchColumnError, AmbiguousColumnNameError, InsertError, UpdateError,
+                QuerySyntaxError, TransactionError)
 
 
 def error_handling(func):
@@ -11,25 +19,61 @@ def error_handling(func):
     def func_with_error_handling(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except (NoSuchTableError, NoSuchColumnError, AmbiguousColumnNameError, InsertError, UpdateError,
-                QuerySyntaxError) as e:
+        except QUERY_ERRORS as e:
             print(e)
 
     return func_with_error_handling
 
 
 class QueryRunner:
-    builders = (DescribeQueryBuilder, SelectQueryBuilder, UpdateQueryBuilder, DeleteQueryBuilder, InsertQueryBuilder)
+    _plan_cache_size = Config.plan_cache_size
+    # Maps databases and normalized query texts to the plans built from them, least recently used first
+    _plans = collections.OrderedDict()
 
     @classmethod
     @error_handling
-    def execute(cls, query_text):
-        builders, parts = iter(cls.builders), None
-        while parts is None:
-            try:
-                QueryBuilder = next(builders)
-            except StopIteration:
-                raise QuerySyntaxError('input matches no known query')
-            parts = QueryBuilder.pattern.fullmatch(query_text)
-        query = QueryBuilder.from_parts(parts)
-        query.run()
+    def execute(cls, query_text, parameters=()):
+        cls.run(query_text, parameters)
+
+    @classmethod
+    def run(cls, query_text, parameters=(), *, database_path=None):
+        # Runs a statement and writes its result, raising the errors that execute prints
+        key, plan = cls.checkout(query_text, database_path)
+        try:
+            plan.query.bind(parameters)
+            with plan.query.locked():
+                plan.query.run()
+        finally:
+            cls.release(key, plan)
+
+    @classmethod
+    def checkout(cls, query_text, database_path=None):
+        # The plan of a statement is taken out of the cache while it is in use, and given back by release, so that a
+        # statement that is run again in the meantime, possibly with other parameters, is given a plan of its own.
+        # Whitespace is collapsed in the key, except within quoted values.
+        text = re.sub(r'("(?:\\.|[^"\\])*")|\s+', lambda match: match.group(1) or ' ', query_text.strip())
+        key = database_path, text
+        plan = cls._plans.pop(key, None)
+        if plan is not None and plan.is_current():
+            return key, plan
+        with AbstractQuery.database(database_path):
+            return key, Plan(parse(query_text))
+
+    @classmethod
+    def release(cls, key, plan):
+        if plan.query.cacheable and cls._plan_cache_size > 0:
+            cls._plans[key] = plan
+            if len(cls._plans) > cls._plan_cache_size:
+                cls._plans.popitem(last=False)
+
+
+class Plan:
+    def __init__(self, query):
+        self.query = query
+
+    def is_current(self):
+        # A plan is built against the headers of its tables, which the catalog only reads again when their files change
+        try:
+            return all(self.query.read_headers(table.path) == table.headers for table in self.query.tables)
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,170 @@
+import asyncio
+import concurrent.futures
+import sys
+import traceback
+
+from config.config import Config
+from my_sqlite.conversion import decoded, queries_from_input_lines
+from my_sqlite.error import TransactionError
+from my_sqlite.output import Output
+from my_sqlite.query import Batch
+from my_sqlite.runner import QueryRunner, QUERY_ERRORS
+
+# The protocol is made of lines. A client sends statements as the prompt of my_sqlite.py reads them, i.e. up to a line
+# that ends with a semicolon, and dot-commands as lines of their own. The server answers each statement and each
+# command in order, with any number of 'DATA <length>' lines, each followed by that many bytes of the result, as
+# formatted in the mode of the session, and then either an 'OK' line or an 'ERROR <length>' line followed by the
+# message of the error.
+
+
+class Server:
+    # One process serves every session, so that tables, their headers and the plans of statements are read once for
+    # all of them. The event loop only reads requests and writes responses: statements run in a worker thread, one at a
+    # time since the state of the engine is that of the process, so that long scans never keep other sessions waiting
+    # for a connection or a response.
+    _line_limit = Config.server_line_limit
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self.sessions = set()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._loop = None
+
+    def serve(self, host, port):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve_session, host, port, limit=self._line_limit))
+        address = server.sockets[0].getsockname()
+        print(f'Serving {self.database_path} on {address[0]}:{address[1]}', flush=True)
+        try:
+            self._loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._executor.shutdown()
+            self._loop.close()
+
+    async def _serve_session(self, reader, writer):
+        session = Session(self, writer, self._loop)
+        self.sessions.add(session)
+        try:
+            lines = []
+            while True:
+                line = (await reader.readline()).decode()
+                if not line:
+                    break
+                line = line.strip()
+                if line.startswith('.') and not lines:
+                    session.run_command(line)
+                    await writer.drain()
+                    continue
+                if line:
+                    lines.append(line)
+                if not lines or not line.endswith(';'):
+                    continue
+                for query in queries_from_input_lines(lines):
+                    await self._loop.run_in_executor(self._executor, session.execute, decoded(query))
+                lines = []
+        except (ConnectionError, ValueError) as error:
+            # ValueError stands for a line longer than the limit
+            print(f'my_sqlite: session ended: {error}', file=sys.stderr)
+        finally:
+            self.sessions.discard(session)
+            await self._loop.run_in_executor(self._executor, session.close)
+            writer.close()
+
+
+class Session:
+    _send_timeout = Config.server_send_timeout
+
+    def __init__(self, server, writer, loop):
+        self.server = server
+        self.mode = 'pipe'
+        # The state of the batch of the session, which is only the current one while a statement of the session runs
+        self.batch = None
+        self._writer = writer
+        self._loop = loop
+
+    def run_command(self, line):
+        # Called from the event loop; .output is left to the client, which writes the results it is sent
+        command, *arguments = line.split()
+        if command == '.mode' and len(arguments) == 1 and arguments[0] in Output.modes:
+            self.mode = arguments[0]
+            self._writer.write(b'OK\n')
+        else:
+            self._writer.write(self._error(f'Error: unknown command or wrong arguments: {line}\n'
+                                           f"       use .mode {'|'.join(Output.modes)}"))
+
+    def execute(self, query_text):
+        # Called from the worker thread; the result is sent in chunks, each once the previous one has been sent
+        previous_batch = Batch.swap(self.batch)
+        try:
+            key, plan = QueryRunner.checkout(query_text, self.server.database_path)
+            try:
+                self._check_batches(plan.query)
+                with plan.query.locked():
+                    rows = plan.query.rows()
+                    if rows is None:
+                        plan.query.run()
+                    else:
+                        for chunk in Output.chunks(self.mode, plan.query.column_names, rows):
+                            if chunk:
+                                data = chunk.encode()
+                                self._send(b'DATA %d\n%s' % (len(data), data))
+            finally:
+                QueryRunner.release(key, plan)
+        except QUERY_ERRORS as error:
+            self._send(self._error(str(error)))
+            return
+        except ConnectionError:
+            raise
+        except Exception as error:
+            # Any other error ends the statement but not the session
+            traceback.print_exc(file=sys.stderr)
+            self._send(self._error(f'Error: {type(error).__name__}: {error}'))
+            return
+        finally:
+            self.batch = Batch.swap(previous_batch)
+        self._send(b'OK\n')
+
+    def close(self):
+        # The batch of a session that ends is rolled back, so that the tables it holds are released
+        if self.batch is not None:
+            previous_batch = Batch.swap(self.batch)
+            try:
+                QueryRunner.run('ROLLBACK', database_path=self.server.database_path)
+            finally:
+                self.batch = Batch.swap(previous_batch)
+
+    def _check_batches(self, query):
+        # Sessions share the locks of the process, so a table that the batch of a session writes to is kept from the
+        # other sessions here
+        if not query.writes:
+            return
+        for session in list(self.server.sessions):
+            if session is not self:
+                held = [table for table in query.tables if table.path in Batch.paths(session.batch)]
+                if held:
+                    raise TransactionError(f'cannot write to {held[0].name} - a transaction of another session '
+                                           f'writes to it')
+
+    def _send(self, data):
+        # Raises ConnectionError if the client does not read what it was sent in time, which ends the statement, and
+        # thus releases its locks, and then the session
+        self._loop.call_soon_threadsafe(self._writer.write, data)
+        asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result()
+
+    async def _drain(self):
+        try:
+            await asyncio.wait_for(self._writer.drain(), self._send_timeout)
+        except asyncio.TimeoutError:
+            self._writer.transport.abort()
+            raise ConnectionAbortedError(f'the client read nothing for {self._send_timeout} seconds')
+
+    @staticmethod
+    def _error(message):
+        data = message.encode()
+        return b'ERROR %d\n%s' % (len(data), data)
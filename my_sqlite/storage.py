@@ -0,0 +1,172 @@
+import collections
+import functools
+import itertools
+import locale
+import os
+
+from config.config import Config
+
+# The encoding used by open() when none is specified, which is how table files are read and written
+encoding = locale.getpreferredencoding(False)
+
+_record_sep = Config.record_separator
+_encoded_record_sep = _record_sep.encode(encoding)
+_encoded_unit_sep = Config.unit_separator.encode(encoding)
+_buffer_size = Config.scan_buffer_size
+
+Stamp = collections.namedtuple('Stamp', ['mtime', 'size'])
+
+# Number of bytes, or characters for files opened as text, read from table, index and log files by the process, which
+# EXPLAIN ANALYZE attributes to the operators that read them; it is only added to once per buffer
+bytes_read = 0
+
+
+def stamp(path):
+    stat = os.stat(path)
+    return Stamp(mtime=stat.st_mtime_ns, size=stat.st_size)
+
+
+def split_records(file):
+    # Yields complete records only; trailing characters that are not followed by a separator are dropped
+    global bytes_read
+    separator = _record_sep if isinstance(file.read(0), str) else _encoded_record_sep
+    remainder = separator[:0]
+    for chunk in iter(functools.partial(file.read, _buffer_size), separator[:0]):
+        bytes_read += len(chunk)
+        records = (remainder + chunk).split(separator)
+        remainder = records.pop()
+        yield from records
+
+
+def offset_records(path, start=0):
+    # Yields (byte offset, encoded record) pairs from the given byte offset, the header included if it is 0
+    with open(path, 'rb') as table_file:
+        table_file.seek(start)
+        offset = start
+        for record in split_records(table_file):
+            yield offset, record
+            offset += len(record) + len(_encoded_record_sep)
+
+
+def offset_units(path, column, start=0):
+    # Yields (byte offset, unit) pairs for the given column of every record but the header, from the given byte offset
+    for offset, record in itertools.islice(offset_records(path, start), 1 if start == 0 else 0, None):
+        yield offset, record.split(_encoded_unit_sep, column + 1)[column].decode(encoding)
+
+
+def count_records(path, start=0):
+    # Number of complete records from the given byte offset, the header included if it is 0
+    with open(path, 'rb') as table_file:
+        table_file.seek(start)
+        chunks = iter(functools.partial(table_file.read, _buffer_size), b'')
+        return sum(chunk.count(_encoded_record_sep) for chunk in chunks)
+
+
+def read_records_at(path, offsets):
+    # Yields (byte offset, record) pairs. Offsets are expected in increasing order, so that records sharing a buffer
+    # are only read from disk once
+    with RecordReader(path) as reader:
+        yield from reader.read(offsets)
+
+
+class RecordReader:
+    # Reads the records at given byte offsets of a table file, which it keeps open along with the last buffer it read,
+    # so that the records of successive reads that share that buffer are only read from disk once. Reads of records
+    # far apart are best given a read size of about a record.
+    def __init__(self, path, read_size=_buffer_size):
+        self._file = open(path, 'rb')
+        self._read_size = read_size
+        self._start, self._buffer = 0, b''
+
+    def read(self, offsets):
+        # Yields (byte offset, record) pairs, offsets being expected in increasing order
+        global bytes_read
+        for offset in offsets:
+            start, buffer = self._start, self._buffer
+            end = buffer.find(_encoded_record_sep, offset - start) if start <= offset < start + len(buffer) else -1
+            if end == -1:
+                self._file.seek(offset)
+                start, buffer = offset, self._file.read(self._read_size)
+                bytes_read += len(buffer)
+                end = buffer.find(_encoded_record_sep)
+                while end == -1:
+                    chunk = self._file.read(self._read_size)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    bytes_read += len(chunk)
+                    end = buffer.find(_encoded_record_sep, len(buffer) - len(chunk))
+                self._start, self._buffer = start, buffer
+            if end != -1:
+                yield offset, buffer[offset - start:end].decode(encoding)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def record_ranges(path, size):
+    # (start, end) byte ranges of at least the given size, which cover every complete record of a table file but the
+    # header, and each end right after a record separator
+    with open(path, 'rb') as table_file:
+        start = _record_end(table_file, 0)
+        while start is not None:
+            end = _record_end(table_file, start + size)
+            if end is None:
+                table_file.seek(start)
+                last = table_file.read().rfind(_encoded_record_sep)
+                if last != -1:
+                    yield start, start + last + len(_encoded_record_sep)
+                return
+            yield start, end
+            start = end
+
+
+def _record_end(file, position):
+    # Byte offset right after the first record separator found from the given position, or None if there is none
+    file.seek(position)
+    tail = b''
+    for chunk in iter(functools.partial(file.read, _buffer_size), b''):
+        buffer = tail + chunk
+        end = buffer.find(_encoded_record_sep)
+        if end != -1:
+            return position + end + len(_encoded_record_sep)
+        tail = buffer[len(buffer) - len(_encoded_record_sep) + 1:]
+        position += len(buffer) - len(tail)
+    return None
+
+
+def temporary_path(path):
+    # A file next to the given one, which is written in full and then renamed to it, so that the file is replaced at
+    # once; it is named after the process, so that processes never write the same temporary file
+    return path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+
+
+def write_atomically(path, text):
+    written_path = temporary_path(path)
+    with open(written_path, 'w') as file:
+        file.write(text)
+    os.replace(written_path, path)
+
+
+def copy_without(path, destination_path, spans, end):
+    # Copies the file up to the given byte offset, without the given sorted (start, end) byte spans
+    with open(path, 'rb') as source, open(destination_path, 'wb') as destination:
+        position = 0
+        for span_start, span_end in itertools.chain(spans, [(end, end)]):
+            source.seek(position)
+            remaining = span_start - position
+            while remaining > 0:
+                chunk = source.read(min(remaining, _buffer_size))
+                destination.write(chunk)
+                remaining -= len(chunk)
+            position = span_end
+
+
+def encoded_length(text):
+    return len(text.encode(encoding))
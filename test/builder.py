@@ -1,15 +1,37 @@
+import glob
 import os
+import re
 import shutil
-
+import subprocess
+import sys
+from pathlib import Path
+
+from config.config import Config
+from my_sqlite.catalog import Catalog
+from my_sqlite.connection import connect
+from my_sqlite.error import NoSuchTableError, ProgrammingError, QuerySyntaxError, TransactionError
+from my_sqlite.lock import TableLock
+from my_sqlite.output import JsonLines, Output
+from my_sqlite.query import AbstractQuery, Descending, FilteredQuery, Select, TableCache
 from my_sqlite.runner import QueryRunner
 
 
 class TestSuite:
     @staticmethod
     def run(queries):
-        for query, expected in queries:
-            print(f"Running '{query}'")
-            QueryRunner.execute(query)
+        for query, *parameters, expected in queries:
+            print(f"Running '{query}'" + (f' with {parameters[0]}' if parameters else ''))
+            QueryRunner.execute(query, *parameters)
+            print(f"Expected: {expected}\n")
+
+    @staticmethod
+    def run_calls(calls):
+        for call, function, expected in calls:
+            print(f'Running {call}')
+            try:
+                print(function())
+            except (NoSuchTableError, QuerySyntaxError, TransactionError) as e:
+                print(e)
             print(f"Expected: {expected}\n")
 
 
@@ -42,7 +64,23 @@ if __name__ == '__main__':
 
                       ('SELECT nameLast, nameFirst, yearId, hr '
                        'FROM players JOIN batting ON batting.playerId = players.id '
-                       'ORDER BY hr DESC, nameLast, nameFirst, yearId LIMIT 10', 'Success')]
+                       'ORDER BY hr DESC, nameLast, nameFirst, yearId LIMIT 10', 'Success'),
+
+                      ('SELECT nameFirst, nameLast, teamID FROM players JOIN pitching '
+                       'WHERE players.nameLast = "Seager" ORDER BY teamID DESC LIMIT 3',
+                       'Corey|Seager|WS9\nCorey|Seager|WS2\nCorey|Seager|WS2'),
+
+                      ('SELECT nameFirst, nameLast, yearID, HR FROM players JOIN batting '
+                       'WHERE batting.playerID = players.id ORDER BY HR DESC LIMIT 1', 'Luis|Gonzalez|2001|57'),
+
+                      ('SELECT SUM(*) FROM batting', 'Syntax error'),
+
+                      ('SELECT teamID, HR FROM batting GROUP BY teamID', 'Syntax error'),
+
+                      ('SELECT COUNT(*), SUM(HR), MIN(HR), MAX(HR) FROM batting', '5466|15255|0|57'),
+
+                      ('SELECT teamID, COUNT(*), SUM(HR) FROM batting GROUP BY teamID ORDER BY SUM(HR) DESC LIMIT 3',
+                       'CHA|285|1245\nBAL|177|1017\nSLN|313|900')]
 
     update_queries = [('UPDATE players', 'Syntax error'),
 
@@ -57,10 +95,17 @@ if __name__ == '__main__':
                       ('UPDATE players SET (birthCountry = "USofA", deathCountry = "Canada") '
                        'WHERE birthCountry = "USA"', 'Syntax error'),
 
+                      ('UPDATE players SET id = "1" WHERE id = "2"', 'Update error'),
+
                       ('UPDATE players SET id = "42000" WHERE id = "42"', 'Success'),
 
                       ('UPDATE players SET birthCountry = "USofA", deathCountry = "Canada" '
-                       'WHERE birthCountry = "USA"', 'Success')]
+                       'WHERE birthCountry = "USA"', 'Success'),
+
+                      ('SELECT id, birthCountry, deathCountry FROM players WHERE id = "42000"', '42000|Mexico|'),
+
+                      ('SELECT id, birthCountry, deathCountry FROM players WHERE deathCountry = "Canada" LIMIT 2',
+                       '0|USofA|Canada\n1|USofA|Canada')]
 
     insert_queries = [('INSERT INTO players', 'Syntax error'),
 
@@ -113,12 +158,487 @@ if __name__ == '__main__':
 
                       ('DELETE FROM players', 'Success')]
 
+    vacuum_queries = [('VACUUM players, batting', 'Syntax error'),
+
+                      ('VACUUM roger', 'No such table'),
+
+                      ('VACUUM players', 'Success'),
+
+                      ('VACUUM', 'Success')]
+
+    # Run again on the players table as it was, with the delta log enabled and not compacted until compact_log
+    delta_log_queries = [('UPDATE players SET nameFirst = "Cory" WHERE id = "806"', 'Success'),
+
+                         ('DELETE FROM players WHERE id = "144"', 'Success'),
+
+                         ('UPDATE players SET id = "42000" WHERE id = "42"', 'Success'),
+
+                         ('UPDATE players SET id = "806" WHERE id = "674"', 'Update error'),
+
+                         ('INSERT INTO players (id, nameFirst, nameLast) VALUES ("144", "Miguel", "Castro")',
+                          'Success'),
+
+                         ('SELECT id, nameFirst FROM players WHERE id = "806"', '806|Cory'),
+
+                         ('SELECT id, nameFirst FROM players WHERE id = "144"', '144|Miguel'),
+
+                         ('SELECT id, birthCountry FROM players WHERE id = "42000"', '42000|Mexico'),
+
+                         ('SELECT COUNT(*) FROM players', '992')]
+
+    delta_log_path = Path(Config.database_path) / 'players.log'
+    vacuum_log_queries = [('VACUUM players', 'Success'),
+
+                          ('SELECT id, nameFirst FROM players WHERE id = "806"', '806|Cory'),
+
+                          ('SELECT COUNT(*) FROM players', '992')]
+
+    def compact_log():
+        # A write after which the log is larger than the given fraction of the table merges it into the table
+        AbstractQuery._compaction_ratio = 0.0001
+        QueryRunner.run('DELETE FROM players WHERE birthCountry = "Cuba"', database_path=Config.database_path)
+        QueryRunner.run('UPDATE players SET nameLast = "Seager" WHERE nameLast = "Seager"',
+                        database_path=Config.database_path)
+        return delta_log_path.is_file(), connect('mlb').execute('SELECT COUNT(*) FROM players').fetchall()
+
+    delta_log_calls = [('delta_log_path.is_file()', delta_log_path.is_file, 'True')]
+    vacuum_log_calls = [('delta_log_path.is_file()', delta_log_path.is_file, 'False'),
+
+                        ('compact_log()', compact_log, "(False, [('981',)])")]
+
+    transaction_queries = [('COMMIT', 'Error: no transaction is active'),
+
+                           ('BEGIN TRANSACTION', 'Success'),
+
+                           ('BEGIN', 'Error: transaction within a transaction'),
+
+                           ('INSERT INTO players (id, nameFirst, nameLast) VALUES ("9001", "Jane", "Doe")', 'Success'),
+
+                           ('INSERT INTO players (id) VALUES ("9001")', 'Error: more than one record with id 9001'),
+
+                           ('UPDATE players SET nameLast = "Roe" WHERE id = "9001"', 'Success'),
+
+                           ('SELECT id, nameFirst, nameLast FROM players WHERE id = "9001"', '9001|Jane|Roe'),
+
+                           ('ROLLBACK', 'Success'),
+
+                           ('SELECT id, nameFirst, nameLast FROM players WHERE id = "9001"', ''),
+
+                           ('BEGIN', 'Success'),
+
+                           ('INSERT INTO players (id, nameFirst, nameLast) VALUES ("9002", "John", "Doe")', 'Success'),
+
+                           ('DELETE FROM players WHERE id = "9002"', 'Success'),
+
+                           ('INSERT INTO players (id, nameFirst, nameLast) VALUES ("9002", "Jim", "Doe")', 'Success'),
+
+                           ('END TRANSACTION', 'Success'),
+
+                           ('SELECT id, nameFirst, nameLast FROM players WHERE id = "9002"', '9002|Jim|Doe'),
+
+                           ('DELETE FROM players WHERE id = "9002"', 'Success')]
+
+    parameter_queries = [('INSERT INTO players (id, nameFirst, nameLast) VALUES (?, ?, "Doe"), (?, ?, "Doe")',
+                          ['9003', 'Jane', '9004', 'John'], 'Success'),
+
+                         ('SELECT nameFirst, nameLast FROM players WHERE id = ?', ['9003'], 'Jane|Doe'),
+
+                         ('SELECT nameFirst, nameLast FROM players WHERE id = ?', ['9004'], 'John|Doe'),
+
+                         ('SELECT nameFirst, nameLast FROM players WHERE id = ?', [], 'Error: 1 parameter expected'),
+
+                         ('UPDATE players SET nameLast = ? WHERE id = ?', ['Roe', '9003'], 'Success'),
+
+                         ('SELECT id, nameFirst, nameLast FROM players WHERE nameLast = ?', ['Roe'], '9003|Jane|Roe'),
+
+                         ('DELETE FROM players WHERE nameFirst = ?', ['Jane'], 'Success'),
+
+                         ('DELETE FROM players WHERE nameFirst = ?', ['John'], 'Success'),
+
+                         ('SELECT COUNT(*) FROM players', '0')]
+
+    copy_queries = [('COPY players FROM "test/players.csv"', 'Success'),
+
+                    ('SELECT id, nameFirst, nameLast FROM players', '9201|Ann|Doe\n9202|Bob|Smith, Jr.\n9203|Cy|Young'),
+
+                    ('COPY players FROM "test/players.csv"', "Error: more than one record with id '9201'"),
+
+                    ('SELECT COUNT(*) FROM players', '3'),
+
+                    ('COPY players FROM "test/roger.csv"', 'Error: cannot read test/roger.csv'),
+
+                    ('COPY players FROM "test/players_latin1.csv"',
+                     'Error: line 3 of test/players_latin1.csv is not utf-8 text'),
+
+                    ('SELECT COUNT(*) FROM players', '3'),
+
+                    ('COPY players FROM test/players.csv', 'Syntax error'),
+
+                    ('COPY players FROM "test/players.csv" DELIMITER ";;"', 'Syntax error'),
+
+                    ('COPY roger FROM "test/players.csv"', 'No such table')]
+
+    def run_script(path):
+        # my_sqlite.py -f, in a process of its own, as it is run from the command line
+        script = subprocess.run([sys.executable, 'my_sqlite.py', 'mlb', '-f', path], stdout=subprocess.PIPE,
+                                universal_newlines=True)
+        return f'{script.stdout}exit status {script.returncode}'
+
+    script_calls = [("run_script('test/script.sql')", lambda: run_script('test/script.sql'),
+                     '9401,Sue,Script\nexit status 0'),
+
+                    ("connection.execute('SELECT nameLast FROM players WHERE id = \"9401\"').fetchall()",
+                     lambda: connection.execute('SELECT nameLast FROM players WHERE id = "9401"').fetchall(),
+                     "[('Scripted',)]"),
+
+                    ("run_script('test/script_error.sql')", lambda: run_script('test/script_error.sql'),
+                     'Error: no such table: roger\nError: the script was rolled back\nexit status 1'),
+
+                    ("connection.execute('SELECT id FROM players WHERE id > \"9401\"').fetchall()",
+                     lambda: connection.execute('SELECT id FROM players WHERE id > "9401"').fetchall(), '[]'),
+
+                    ("run_script('test/missing.sql')", lambda: run_script('test/missing.sql'),
+                     "Error: [Errno 2] No such file or directory: 'test/missing.sql'\nexit status 1"),
+
+                    ("connection.execute('DELETE FROM players WHERE id = \"9401\"').description",
+                     lambda: connection.execute('DELETE FROM players WHERE id = "9401"').description, 'None')]
+
+    connection = connect('mlb')
+    cursor = connection.cursor()
+
+    def insert_then_fail():
+        with connection:
+            connection.execute('BEGIN')
+            connection.execute('INSERT INTO players (id, nameFirst) VALUES ("9204", "Di")')
+            connection.execute('SELECT * FROM roger')
+
+    def insert_then_commit():
+        with connection:
+            connection.execute('BEGIN')
+            connection.execute('INSERT INTO players (id, nameFirst) VALUES (?, ?)', ['9205', 'Ed'])
+
+    def select_after(player_id):
+        return connection.execute('SELECT id, nameFirst FROM players WHERE id > ?', [player_id]).fetchall()
+
+    def transactions_of_their_own():
+        # Closing a connection rolls back its own transaction only, and a table written to by the transaction of one
+        # connection cannot be written to by another until it ends
+        first, second, third = connect('mlb'), connect('mlb'), connect('mlb')
+        first.execute('BEGIN')
+        first.execute('INSERT INTO players (id, nameFirst) VALUES ("9207", "Flo")')
+        second.execute('BEGIN')
+        second.close()
+        try:
+            third.execute('DELETE FROM players WHERE id = "9207"')
+        except TransactionError as error:
+            refused = str(error)
+        seen = third.execute('SELECT id FROM players WHERE id = "9207"').fetchall()
+        first.commit()
+        committed = third.execute('SELECT nameFirst FROM players WHERE id = "9207"').fetchall()
+        third.execute('DELETE FROM players WHERE id = "9207"')
+        third.close()
+        return refused, seen, committed
+
+    def closed_connection():
+        # A closed connection, unlike one closed again, raises an error on any other use
+        closed = connect('mlb')
+        closed.close()
+        closed.close()
+        errors = []
+        for use in (closed.cursor, lambda: closed.execute('SELECT id FROM players'), closed.commit):
+            try:
+                use()
+            except ProgrammingError as error:
+                errors.append(str(error))
+        return errors
+
+    def mixed_order():
+        # ORDER BY, as MIN and MAX, puts the numbers of a column before its strings, or after them when descending
+        mixed = connect('mlb')
+        mixed.execute('INSERT INTO players (id, nameFirst) VALUES ("9210", "Zed"), ("9211", "42"), ("9212", "7")')
+        selected = [mixed.execute(f'SELECT nameFirst FROM players WHERE id > "9209" ORDER BY nameFirst{order}')
+                    .fetchall() for order in ('', ' DESC')]
+        extrema = mixed.execute('SELECT MIN(nameFirst), MAX(nameFirst) FROM players WHERE id > "9209"').fetchall()
+        mixed.execute('DELETE FROM players WHERE id > "9209"')
+        mixed.close()
+        return selected, extrema
+
+    def close_partly_fetched():
+        # The tables of a cursor are locked until its rows run out or it is closed, with its connection or not
+        other = connect('mlb')
+        partly_fetched = other.execute('SELECT id FROM players ORDER BY id')
+        partly_fetched.fetchone()
+        locked = bool(TableLock._held)
+        other.close()
+        return locked, bool(TableLock._held), partly_fetched.fetchone()
+
+    connection_calls = [("cursor.execute('SELECT id, nameFirst FROM players ORDER BY id').description",
+                         lambda: [column[0] for column in
+                                  cursor.execute('SELECT id, nameFirst FROM players ORDER BY id').description],
+                         "['ID', 'nameFirst']"),
+
+                        ('cursor.fetchone()', cursor.fetchone, "('9201', 'Ann')"),
+
+                        ('cursor.fetchmany(5)', lambda: cursor.fetchmany(5), "[('9202', 'Bob'), ('9203', 'Cy')]"),
+
+                        ('cursor.fetchone()', cursor.fetchone, 'None'),
+
+                        ("cursor.execute('DESCRIBE roger')", lambda: cursor.execute('DESCRIBE roger'),
+                         'No such table'),
+
+                        ('insert_then_fail()', insert_then_fail, 'No such table'),
+
+                        ('insert_then_commit()', insert_then_commit, 'None'),
+
+                        ("connection.execute('SELECT id, nameFirst FROM players WHERE id > ?', ['9203']).fetchall()",
+                         lambda: select_after('9203'),
+                         "[('9205', 'Ed')]"),
+
+                        ('transactions_of_their_own()', transactions_of_their_own,
+                         "('Error: cannot write to players - a transaction of another connection writes to it', [], "
+                         "[('Flo',)])"),
+
+                        ('closed_connection()', closed_connection,
+                         "['Error: cannot operate on a closed connection', "
+                         "'Error: cannot operate on a closed connection', "
+                         "'Error: cannot operate on a closed connection']"),
+
+                        ('mixed_order()', mixed_order,
+                         "([[('7',), ('42',), ('Zed',)], [('Zed',), ('42',), ('7',)]], [('7', 'Zed')])"),
+
+                        ('close_partly_fetched()', close_partly_fetched, '(True, False, None)')]
+
+    players_path = Path(Config.database_path) / f'players{Config.table_filename_extension}'
+    batting_path = Path(Config.database_path) / f'batting{Config.table_filename_extension}'
+    catalog_calls = [('Catalog.statistics(batting_path).rows', lambda: Catalog.statistics(batting_path).rows, '5466'),
+
+                     ('Catalog.column_statistics(batting_path, 12)',
+                      lambda: Catalog.column_statistics(batting_path, 12),
+                      'ColumnStatistics(distinct=46, min=0, max=57)'),
+
+                     ('Catalog.column_statistics(batting_path, 0).distinct',
+                      lambda: Catalog.column_statistics(batting_path, 0).distinct, 'about 5466'),
+
+                     ('Catalog.statistics(players_path).rows', lambda: Catalog.statistics(players_path).rows, '4'),
+
+                     ('Catalog.column_statistics(players_path, 0)', lambda: Catalog.column_statistics(players_path, 0),
+                      'ColumnStatistics(distinct=4, min=9201, max=9205)'),
+
+                     ("QueryRunner.execute('INSERT INTO players (id) VALUES (\"9206\")')",
+                      lambda: QueryRunner.execute('INSERT INTO players (id) VALUES ("9206")'), 'None'),
+
+                     ('Catalog.column_statistics(players_path, 0)', lambda: Catalog.column_statistics(players_path, 0),
+                      'ColumnStatistics(distinct=5, min=9201, max=9206)'),
+
+                     ('Catalog.statistics(players_path).rows', lambda: Catalog.statistics(players_path).rows, '5'),
+
+                     ("QueryRunner.execute('DELETE FROM players WHERE id > \"9203\"')",
+                      lambda: QueryRunner.execute('DELETE FROM players WHERE id > "9203"'), 'None'),
+
+                     ('Catalog.statistics(players_path).rows', lambda: Catalog.statistics(players_path).rows, '3')]
+
+    explain_queries = [('EXPLAIN SELECT nameFirst, nameLast FROM players WHERE id = "806"',
+                        'Output: pipe\n  -> Project: nameFirst, nameLast\n    -> Filter: ID = "806"\n'
+                        '      -> Index lookup: players (1 record)'),
+
+                       ('EXPLAIN SELECT nameFirst, nameLast, yearID, HR FROM players JOIN batting '
+                        'ON batting.playerID = players.id WHERE HR > "50" ORDER BY HR DESC',
+                        'Output: pipe\n  -> Project: nameFirst, nameLast, yearID, HR\n    -> Sort: HR DESC\n'
+                        '      -> Hash join: players.ID = batting.playerID (players held in memory)\n'
+                        '        -> Scan: players (992 records, 3 of 22 columns kept)\n        -> Filter: HR > "50"\n'
+                        '          -> Scan: batting (5466 records, 3 of 21 columns kept)'),
+
+                       ('EXPLAIN SELECT birthCountry, COUNT(*) FROM players WHERE birthYear > "1993" '
+                        'GROUP BY birthCountry ORDER BY COUNT(*) DESC LIMIT 2',
+                        'Output: pipe\n  -> Project: birthCountry, COUNT(*)\n    -> Limit: 2\n'
+                        '      -> Sort: COUNT(*) DESC (top 2 kept in a heap)\n'
+                        '        -> Aggregate: COUNT(*) by birthCountry\n          -> Filter: birthYear > "1993"\n'
+                        '            -> Index lookup: players (3 records)'),
+
+                       ('EXPLAIN DELETE FROM players WHERE id = "806"', 'DELETE: players'),
+
+                       ('EXPLAIN EXPLAIN SELECT * FROM players', 'Syntax error'),
+
+                       ('EXPLAIN ANALYZE', 'Syntax error')]
+
+    def analyze(query):
+        # The times vary from run to run, unlike the rows and bytes
+        return '\n'.join(re.sub(r'time=[\d.]+ ms, ', '', line)
+                         for line, in connect(Config.database_path).execute(f'EXPLAIN ANALYZE {query}'))
+
+    def analyze_in_parallel(query):
+        # The bytes read by the processes of a parallel scan are added to those of the process that explains it
+        FilteredQuery._scan_workers, FilteredQuery._parallel_min_size = 2, 0
+        TableCache.clear()
+        try:
+            return analyze(query)
+        finally:
+            FilteredQuery._scan_workers = Config.scan_workers
+            FilteredQuery._parallel_min_size = Config.parallel_scan_min_size
+
+    def join_bytes(join_buffer_records):
+        # The bytes read by a join of indexed columns, as a fraction of the size of the table files: a merge join is
+        # only chosen for tables with more records than a join holds, and reads a couple of records at a time
+        Select._join_buffer_records = join_buffer_records
+        try:
+            plan = analyze('SELECT COUNT(*) FROM players JOIN batting ON batting.playerID = players.id')
+        finally:
+            Select._join_buffer_records = Config.join_buffer_records
+        read = sum(int(num_bytes) for num_bytes in re.findall(r'bytes read=(\d+)', plan))
+        return plan.split('\n')[3].split(':')[0].strip(' ->'), read / (players_path.stat().st_size +
+                                                                      batting_path.stat().st_size) <= 2
+
+    explain_calls = [("analyze('SELECT nameFirst, nameLast FROM players WHERE id = \"806\"')",
+                      lambda: analyze('SELECT nameFirst, nameLast FROM players WHERE id = "806"'),
+                      'Output: pipe (rows in=1, rows out=1, bytes read=0, loops=1)\n'
+                      '  -> Project: nameFirst, nameLast (rows in=1, rows out=1, bytes read=0, loops=1)\n'
+                      '    -> Filter: ID = "806" (rows in=1, rows out=1, bytes read=0, loops=1)\n'
+                      '      -> Index lookup: players (1 record) (rows out=1, bytes read=19569, loops=1)'),
+
+                     ("analyze_in_parallel('SELECT yearID, HR FROM batting WHERE HR > \"50\"')",
+                      lambda: analyze_in_parallel('SELECT yearID, HR FROM batting WHERE HR > "50"'),
+                      'Output: pipe (rows in=1, rows out=1, bytes read=0, loops=1)\n'
+                      '  -> Project: yearID, HR (rows in=1, rows out=1, bytes read=0, loops=1)\n'
+                      '    -> Parallel scan: batting (1 range filtered by 2 processes) '
+                      '(rows out=1, bytes read=308493, loops=1)'),
+
+                     ("analyze_in_parallel('DELETE FROM batting WHERE HR > \"100\"')",
+                      lambda: analyze_in_parallel('DELETE FROM batting WHERE HR > "100"'),
+                      'DELETE: batting (bytes read=308493, loops=1)'),
+
+                     ('join_bytes(Config.join_buffer_records)', lambda: join_bytes(Config.join_buffer_records),
+                      "('Hash join', True)"),
+
+                     ('join_bytes(0)', lambda: join_bytes(0), "('Merge join', True)")]
+
+    columnar_calls = [('type(TableCache._entries[batting_path].records).__name__',
+                       lambda: type(TableCache._entries[batting_path].records).__name__, 'ColumnarTable')]
+
+    def cache_used_after_self_join():
+        # Both scans of a self-join read the table at once, and cache it in turn
+        Select._join_block_size = 100
+        TableCache.clear()
+        try:
+            connect('mlb').execute('SELECT COUNT(*) FROM players JOIN players').fetchall()
+        finally:
+            Select._join_block_size = Config.join_block_size
+        return TableCache._used == sum(entry.footprint for entry in TableCache._entries.values())
+
+    cache_calls = [('cache_used_after_self_join()', cache_used_after_self_join, 'True')]
+
+    def uncached(statement):
+        # Tables larger than the budget of the cache are scanned by every query, which only keeps the units of the
+        # columns it uses, if any
+        TableCache._budget = 0
+        TableCache.clear()
+        try:
+            return connect('mlb').execute(statement).fetchall()
+        finally:
+            TableCache._budget = Config.table_cache_size
+
+    uncached_calls = [("uncached('SELECT COUNT(*) FROM batting')", lambda: uncached('SELECT COUNT(*) FROM batting'),
+                       "[('5466',)]"),
+
+                      ("uncached('SELECT yearID, HR FROM batting WHERE HR > \"50\"')",
+                       lambda: uncached('SELECT yearID, HR FROM batting WHERE HR > "50"'), "[('2001', '57')]")]
+
+    def compare_with_number():
+        # A text unit of a descending term compared with a number, as in a column of both, is an error of the sort,
+        # not of Descending
+        try:
+            return Descending('Seager') < -5
+        except TypeError as error:
+            return error
+
+    descending_names = [Descending(name) for name in ('Aber', 'Seager', 'Lange')]
+    order_key_calls = [('[key.value for key in sorted(descending_names)]',
+                        lambda: [key.value for key in sorted(descending_names)], "['Seager', 'Lange', 'Aber']"),
+
+                       ("Descending('Seager') == 'Seager'", lambda: Descending('Seager') == 'Seager', 'False'),
+
+                       ('compare_with_number()', compare_with_number,
+                        "'<' not supported between instances of 'Descending' and 'int'")]
+
+    output_query = 'SELECT id, nameGiven, weight FROM players WHERE id < "2" ORDER BY id'
+    output_queries = {'pipe': [(output_query, '0|David Allan|220\n1|Albert Julius|195')],
+                      'csv': [(output_query, '0,David Allan,220\n1,Albert Julius,195')],
+                      'tsv': [(output_query, '0\tDavid Allan\t220\n1\tAlbert Julius\t195')],
+                      'jsonl': [(output_query, '{"ID": 0, "nameGiven": "David Allan", "weight": 220}\n'
+                                               '{"ID": 1, "nameGiven": "Albert Julius", "weight": 195}'),
+                                ('SELECT COUNT(*), MAX(HR) FROM batting', '{"COUNT(*)": 5466, "MAX(HR)": 57}'),
+                                ('SELECT players.id, batting.id, yearID FROM players JOIN batting '
+                                 'ON players.id = batting.playerID WHERE players.id = "806"',
+                                 '{"ID": 806, "ID_2": 5452, "yearID": 2015}')]}
+    jsonl_calls = [("JsonLines(['a', 'b', 'c', 'd', 'e']).line(['007', '1e3', ' 5', '1_000', '2.5'])",
+                    lambda: JsonLines(['a', 'b', 'c', 'd', 'e']).line(['007', '1e3', ' 5', '1_000', '2.5']).strip(),
+                    '{"a": "007", "b": "1e3", "c": " 5", "d": "1_000", "e": 2.5}')]
+
+    create_index_queries = [('CREATE INDEX ON players', 'Syntax error'),
+
+                            ('CREATE INDEX ON players (birthYear, birthMonth)', 'Syntax error'),
+
+                            ('CREATE INDEX ON players, batting (birthYear)', 'Syntax error'),
+
+                            ('CREATE INDEX ON players (roger)', 'No such column'),
+
+                            ('CREATE INDEX ON players (birthYear)', 'Success'),
+
+                            ('SELECT id, nameFirst, nameLast, birthYear FROM players WHERE birthYear > "1993"',
+                             '144|Miguel|Castro|1994\n674|Roberto|Osuna|1995\n806|Corey|Seager|1994'),
+
+                            ('CREATE INDEX ON players (id)', 'Success'),
+
+                            ('CREATE INDEX ON batting (playerID)', 'Success'),
+
+                            ('SELECT nameFirst, nameLast, yearID, HR FROM players JOIN batting '
+                             'ON batting.playerID = players.id WHERE HR > "50"', 'Luis|Gonzalez|2001|57')]
+
     shutil.copy2('mlb/players.csv', 'mlb/players.csv.backup')
     try:
+        TestSuite.run(create_index_queries)
         TestSuite.run(select_queries)
+        # The same queries again, on tables cached column by column once a first query has read them
+        TableCache._columnar, TableCache._budget = True, 256 * 2 ** 20
+        TableCache.clear()
+        try:
+            TestSuite.run(select_queries)
+            TestSuite.run_calls(columnar_calls)
+        finally:
+            TableCache._columnar, TableCache._budget = Config.columnar_tables, Config.table_cache_size
+            TableCache.clear()
+        TestSuite.run(explain_queries)
+        TestSuite.run_calls(explain_calls)
+        TestSuite.run_calls(uncached_calls)
+        TestSuite.run_calls(cache_calls)
+        for mode, queries in output_queries.items():
+            Output.set_mode(mode)
+            TestSuite.run(queries)
+        Output.set_mode('pipe')
+        TestSuite.run_calls(jsonl_calls)
+        TestSuite.run_calls(order_key_calls)
         TestSuite.run(update_queries)
         TestSuite.run(insert_queries)
         TestSuite.run(delete_queries)
+        TestSuite.run(transaction_queries)
+        TestSuite.run(parameter_queries)
+        TestSuite.run(copy_queries)
+        TestSuite.run_calls(script_calls)
+        TestSuite.run_calls(connection_calls)
+        TestSuite.run_calls(catalog_calls)
+        TestSuite.run(vacuum_queries)
+
+        shutil.copy2('mlb/players.csv.backup', 'mlb/players.csv')
+        AbstractQuery._delta_log, AbstractQuery._compaction_ratio = True, None
+        try:
+            TestSuite.run(delta_log_queries)
+            TestSuite.run_calls(delta_log_calls)
+            TestSuite.run(vacuum_log_queries)
+            TestSuite.run_calls(vacuum_log_calls)
+        finally:
+            AbstractQuery._delta_log = Config.delta_log
+            AbstractQuery._compaction_ratio = Config.delta_log_compaction_ratio
     finally:
         shutil.copy2('mlb/players.csv.backup', 'mlb/players.csv')
         os.remove('mlb/players.csv.backup')
+        for side_file in glob.glob('mlb/*.idx') + glob.glob('mlb/players.log'):
+            os.remove(side_file)
@@ -0,0 +1,111 @@
+import multiprocessing
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from config.config import Config
+from my_sqlite.connection import connect
+
+# Several processes write to and read from the same table at once. Each writer inserts rows of its own, one statement
+# at a time, and every few rows updates all of them, which rewrites the whole table (or appends to its log), while the
+# readers check that every result they read is whole: no row lost, repeated or cut.
+WRITERS = 4
+READERS = 4
+ROWS_PER_WRITER = 40
+UPDATE_EVERY = 10
+LATENCY_SAMPLES = 50
+
+
+def create_table(directory):
+    header = Config.unit_separator.join(('id', 'writer', 'value'))
+    (Path(directory) / f'counters{Config.table_filename_extension}').write_text(f'{header}{Config.record_separator}')
+
+
+def write(directory, writer):
+    connection = connect(directory)
+    for i in range(ROWS_PER_WRITER):
+        connection.execute('INSERT INTO counters (id, writer, value) VALUES (?, ?, "")', [f'{writer}-{i}', writer])
+        if i % UPDATE_EVERY == UPDATE_EVERY - 1:
+            # Within a transaction, the table is locked from the first statement that writes to it to the commit
+            with connection:
+                connection.execute('BEGIN')
+                connection.execute('UPDATE counters SET value = ? WHERE writer = ?', [i, writer])
+                connection.execute('INSERT INTO counters (id, writer, value) VALUES (?, ?, ?)', [f'{writer}-t{i}',
+                                                                                                writer, i])
+
+
+def read(directory, stop, results):
+    connection = connect(directory)
+    reads, problems, previous_count = 0, [], 0
+    while not stop.is_set():
+        rows = connection.execute('SELECT id, writer, value FROM counters').fetchall()
+        ids = [row[0] for row in rows]
+        if len(set(ids)) != len(ids):
+            problems.append(f'repeated ids among {len(ids)} rows')
+        if any(len(row) != 3 or not row[0].startswith(f'{row[1]}-') for row in rows):
+            problems.append('a row was cut')
+        if len(rows) < previous_count:
+            problems.append(f'{previous_count - len(rows)} rows lost')
+        previous_count = len(rows)
+        reads += 1
+    results.put((reads, problems))
+
+
+def insert_latency(directory, num_readers):
+    connection = connect(directory)
+    latencies = []
+    for i in range(LATENCY_SAMPLES):
+        start = time.perf_counter()
+        connection.execute('INSERT INTO counters (id, writer, value) VALUES (?, "latency", "")',
+                           [f'latency-{num_readers}-{i}'])
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def with_readers(directory, num_readers, function, *args):
+    stop, results = multiprocessing.Event(), multiprocessing.Queue()
+    readers = [multiprocessing.Process(target=read, args=(directory, stop, results)) for _ in range(num_readers)]
+    for reader in readers:
+        reader.start()
+    try:
+        return function(*args)
+    finally:
+        stop.set()
+        outcomes = [results.get() for _ in readers]
+        for reader in readers:
+            reader.join()
+        reads = sum(reads for reads, _ in outcomes)
+        problems = sorted({problem for _, problems in outcomes for problem in problems})
+        print(f'{num_readers} readers read the table {reads} times, finding '
+              f"{'; '.join(problems) if problems else 'no problem'}")
+
+
+def run_writers(directory):
+    writers = [multiprocessing.Process(target=write, args=(directory, writer)) for writer in range(WRITERS)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as database:
+        create_table(database)
+        print(f'Running {WRITERS} writers along with {READERS} readers')
+        with_readers(database, READERS, run_writers, database)
+        print('Expected: no problem\n')
+
+        rows = connect(database).execute('SELECT writer, COUNT(*), MIN(value), MAX(value) FROM counters '
+                                         'GROUP BY writer ORDER BY writer').fetchall()
+        print(f'Rows of each writer: {rows}')
+        last = ROWS_PER_WRITER - ROWS_PER_WRITER % UPDATE_EVERY - 1
+        expected_rows = ROWS_PER_WRITER + ROWS_PER_WRITER // UPDATE_EVERY
+        print(f"Expected: {[(str(writer), str(expected_rows), str(last), str(last)) for writer in range(WRITERS)]}\n")
+
+        # Readers hold their lock for as long as they read, but writers only wait for the readers that were reading
+        # when they asked for it, so that the time an INSERT takes does not depend on how many processes read at once
+        for num_readers in (0, READERS):
+            latency = with_readers(database, num_readers, insert_latency, database, num_readers)
+            print(f'Median INSERT time with {num_readers} readers: {latency * 1000:.1f}ms')
+        print('Expected: about the same times, unless the readers keep every CPU busy\n')
@@ -190,3 +190,5 @@ if __name__ == '__main__':
     finally:
         shutil.copy2('mlb/players.csv.backup', 'mlb/players.csv')
         os.remove('mlb/players.csv.backup')
+        if os.path.exists('mlb/players.log'):
+            os.remove('mlb/players.log')
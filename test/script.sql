@@ -0,0 +1,5 @@
+INSERT INTO players (id, nameFirst, nameLast) VALUES ("9401", "Sue", "Script");
+.mode csv
+SELECT id, nameFirst, nameLast
+FROM players WHERE id = "9401";
+UPDATE players SET nameLast = "Scripted" WHERE id = "9401";
@@ -0,0 +1,3 @@
+INSERT INTO players (id, nameFirst) VALUES ("9402", "Rollo");
+SELECT * FROM roger;
+INSERT INTO players (id, nameFirst) VALUES ("9403", "Never");
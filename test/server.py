@@ -0,0 +1,89 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from config.config import Config
+from my_sqlite.client import Client
+from my_sqlite.error import RemoteError
+
+CONCURRENT_CLIENTS = 8
+
+
+def start_server(database):
+    # The server is given any free port, which it prints once it listens
+    server = subprocess.Popen([sys.executable, 'my_sqlite.py', database, '--serve', '127.0.0.1:0'],
+                              stdout=subprocess.PIPE, universal_newlines=True)
+    return server, server.stdout.readline().split()[-1]
+
+
+def run(client, statement, expected):
+    print(f"Running '{statement}'")
+    try:
+        print(client.execute(statement), end='')
+    except RemoteError as e:
+        print(e)
+    print(f'Expected: {expected}\n')
+
+
+def count_batting(address, results):
+    with Client(address) as client:
+        results.extend(client.execute('SELECT COUNT(*) FROM batting') for _ in range(5))
+
+
+if __name__ == '__main__':
+    shutil.copy2('mlb/players.csv', 'mlb/players.csv.backup')
+    server, address = start_server(Config.database_path)
+    try:
+        results = []
+        threads = [threading.Thread(target=count_batting, args=(address, results)) for _ in range(CONCURRENT_CLIENTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"Running 'SELECT COUNT(*) FROM batting' 5 times from each of {CONCURRENT_CLIENTS} clients at once")
+        print(f'{len(results)} results: {sorted(set(results))}')
+        print(f"Expected: {5 * CONCURRENT_CLIENTS} results: ['5466\\n']\n")
+
+        with Client(address) as first, Client(address) as second:
+            first.command('.mode csv')
+            run(first, 'SELECT nameFirst, nameLast FROM players WHERE id = "806"', 'Corey,Seager')
+            run(second, 'SELECT nameFirst, nameLast FROM players WHERE id = "806"', 'Corey|Seager')
+            run(second, 'SELECT * FROM roger', 'No such table')
+
+            run(first, 'BEGIN', 'Success')
+            run(first, 'INSERT INTO players (id, nameFirst, nameLast) VALUES ("9301", "Jane", "Doe")', 'Success')
+            run(first, 'SELECT id, nameFirst FROM players WHERE id = "9301"', '9301,Jane')
+            run(second, 'SELECT id, nameFirst FROM players WHERE id = "9301"', '')
+            run(second, 'INSERT INTO players (id) VALUES ("9302")',
+                'Error: cannot write to players - a transaction of another session writes to it')
+            run(first, 'COMMIT', 'Success')
+            run(second, 'SELECT id, nameFirst FROM players WHERE id = "9301"', '9301|Jane')
+            run(second, 'INSERT INTO players (id) VALUES ("9302")', 'Success')
+
+        # The batch of a client that disconnects is rolled back
+        with Client(address) as first:
+            run(first, 'BEGIN', 'Success')
+            run(first, 'DELETE FROM players WHERE id = "9301"', 'Success')
+        with Client(address) as second:
+            run(second, 'SELECT id FROM players WHERE id > "9300"', '9301\n9302')
+            run(second, 'DELETE FROM players WHERE id > "9300"', 'Success')
+
+        # A client that stops reading its result holds the other sessions until its session ends
+        host, _, port = address.rpartition(':')
+        with socket.create_connection((host, int(port))) as stalled, Client(address) as other:
+            stalled.sendall(b'SELECT * FROM batting; ' * 40 + b'\n')
+            time.sleep(1)
+            start = time.monotonic()
+            run(other, 'SELECT nameFirst, nameLast FROM players WHERE id = "806"', 'Corey|Seager')
+            waited = time.monotonic() - start
+            print(f'Answered within the send timeout: {waited < Config.server_send_timeout + 5}')
+            print('Expected: True\n')
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.copy2('mlb/players.csv.backup', 'mlb/players.csv')
+        os.remove('mlb/players.csv.backup')